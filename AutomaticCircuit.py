@@ -5,20 +5,90 @@ Navigates a 5m x 3m course clockwise as fast as possible
 Course consists of 50cm x 50cm panels
 """
 
+import asyncio
 import time
 import math
+import os
 import sys
+import threading
 from typing import Optional, List, Tuple
 from spherov2 import scanner
 from spherov2.types import Color
-from spherov2.sphero_edu import SpheroEduAPI
+from spherov2.sphero_edu import EventType, SpheroEduAPI
+from cornering import build_cornering_path
+from course import COURSE_WAYPOINTS, chain_laps
+from headings import is_turn, normalize_heading, shortest_turn, turn_direction
+from pure_pursuit import PurePursuitTracker
+from scheduler import DeadlineScheduler
+from pose_filter import PoseEstimator
+from sensor_stream import STREAM_INDEX, SensorRing, SensorStream
+from telemetry_log import TelemetryWriter
+from async_race import AsyncRaceEngine
+from command_filter import StatefulAPI
+from dispatcher import CommandDispatcher, DispatchedAPI
+from lap_learning import (LEARNING_PATH, ROLLING, STANDING, LapLearner, end_point_error, learning_key,
+                          load_learner, save_learner)
+from landmarks import LandmarkAnchor
+from lap_timing import LapTimer
+from instrumentation import CommandProfiler, LatencyEstimator, ProfiledAPI, RaceTimer, TimedAPI
+from racing_line import line_gain, optimize_racing_line
+from segment_plan import APPROACH, STRAIGHT, TURN, expected_velocity, segment_class
+from speed_calibration import CALIBRATION_PATH, calibrate_speeds, load_speed_table, save_speed_table
+from turn_calibration import (TURN_CALIBRATION_PATH, characterize_turns, load_turn_table,
+                              save_turn_table, wait_for_settle)
+from speed_profile import RobotModel, SegmentProfile, lap_time, plan_speed_profile
 
 class SpheroRacer:
-    def __init__(self, toy_name: Optional[str] = None):
+    def __init__(self, toy_name: Optional[str] = None, scheduler: Optional[DeadlineScheduler] = None):
         self.toy = None
         self.api = None
         self.toy_name = toy_name
         self.start_time = None
+        # Absolute deadlines for every wait in the race; all race timing reads its clock
+        self.scheduler = scheduler or DeadlineScheduler()
+        self.timer = RaceTimer(self.scheduler.clock)  # Per-phase time breakdown of the race
+        self.REPORT_PATH = None  # JSON file for the per-segment breakdown, if set
+        self.profiler = CommandProfiler(self.scheduler.clock)  # Latency of every API call
+        self.LATENCY_REPORT_PATH = None  # JSON file for the latency histograms, if set
+        
+        # Latency compensation: send commands early by their measured latency
+        self.LATENCY_COMPENSATION = False
+        self.latency = LatencyEstimator()
+        self.profiler.listeners.append(self.latency.observe)
+        
+        # Priority dispatch: motion commands before LED, LED before telemetry
+        self.PRIORITY_DISPATCH = False
+        
+        # Drop commands that repeat the robot's state, merge heading+speed pairs
+        self.SUPPRESS_REDUNDANT = False
+        
+        # asyncio race engine instead of the blocking segment loop
+        self.ASYNC_ENGINE = False
+        self.SENSOR_RATE = 50        # Hz locator/velocity sampling in the engine
+        
+        # High-rate sensor stream into a ring buffer (read instead of polling the API)
+        self.SENSOR_STREAM = False
+        self.STREAM_CAPACITY = 4096  # Samples kept, ~40s at the 10ms streaming interval
+        self.sensor_ring = None
+        self.stream = None
+        
+        # Binary telemetry log of the race (starts the sensor stream when set)
+        self.TELEMETRY_PATH = None  # .tlm file, or a directory for one file per race
+        self.telemetry = None
+        self.telemetry_cursor = 0   # Ring samples already written
+        self.telemetry_dropped = 0  # Samples overwritten in the ring before they were written
+        self.telemetry_lock = threading.RLock()  # Stream listener and race thread both write
+        
+        # Kalman-filtered pose from the sensor stream (starts the stream when set)
+        self.POSE_FILTER = False
+        self.pose = PoseEstimator()
+        
+        # Re-anchor the position estimate across a course wall when the robot bumps into one
+        # (a turn in place is no anchor: the robot still rolls through the corner and stops past it)
+        self.LANDMARK_RESET = False
+        self.LANDMARK_RADIUS = 15  # cm the estimate may be off across a wall and still match it
+        self.ROBOT_RADIUS = 3.65   # cm, half the BOLT's 73mm shell
+        self.landmarks = None
         self.total_distance = 0.0
         self.calibrated = False
         
@@ -31,29 +101,59 @@ class SpheroRacer:
         self.STRAIGHT_SPEED = 80   # High speed for straight segments
         self.TURN_SPEED = 40      # Slower speed for turns
         self.APPROACH_SPEED = 60  # Medium speed when approaching turns
-          # Course waypoints (clockwise from start/finish line)
-        # Coordinates in cm, heading in degrees
-        # Aangepast voor het werkelijke parcours layout
-        self.waypoints = [
-            (200, 250, 0),        
-            (450, 250, 0),      
-            (450, 250, 90),     
-            (450, 50, 90),   
-            (450, 50, 180),     
-            (350, 50, 180),      
-            (350, 50, 270),     
-            (350, 150, 270),     
-            (350, 150, 180),       
-            (150, 150, 180), 
-            (150, 150, 90),   
-            (150, 50, 90),   
-            (150, 50, 180),   
-            (50, 50, 180),   
-            (50, 50, 270),   
-            (50, 250, 270),   
-            (50, 250, 0),   
-            (250, 250, 0)   
-        ]
+        
+        # Closed-loop segment termination (locator instead of timed sleeps)
+        self.CLOSED_LOOP = False
+        self.ARRIVAL_TOLERANCE = 3   # cm before the waypoint that counts as arrived
+        self.POLL_INTERVAL = 0.02    # s between locator reads
+        self.location_origin = None  # (locator x, locator y, course x, course y)
+        
+        # Continuous motion: no stop/settle delays between segments
+        self.CONTINUOUS_MOTION = False
+        
+        # Speed-profile planner: accelerate, cruise, brake just before each corner
+        self.SPEED_PROFILE = False
+        self.PROFILE_STEP = 0.05     # s between speed updates along a profile
+        self.robot_model = RobotModel()
+        
+        # Measured speed -> cm/s table per surface (None: fixed 0.8/0.6 estimates)
+        self.SURFACE = None              # Calibrated surface to race on
+        self.SPEED_TABLE_PATH = CALIBRATION_PATH
+        self.CALIBRATE_SPEEDS = False    # Run the calibration sweep before the race
+        self.speed_table = None
+        
+        # Turn-in-place timing: gyro-confirmed settle, else the measured table of SURFACE
+        self.TURN_SETTLE = False
+        self.TURN_TIMEOUT = 1.5          # s a gyro-confirmed turn may take at most
+        self.TURN_TABLE_PATH = TURN_CALIBRATION_PATH
+        self.CHARACTERIZE_TURNS = False  # Measure the turn table before the race
+        self.turn_table = None
+        
+        # Multi-lap sessions that learn per-segment speed and distance corrections
+        self.LAPS = 1
+        self.LEARNING_PATH = LEARNING_PATH
+        self.learner = None
+        self.race_time = None
+        
+        # Seamless multi-lap race: one run through LAPS laps, split on finish line crossings
+        self.SEAMLESS_LAPS = False
+        self.FINISH_HALF_WIDTH = 50  # cm either side of the finish waypoint that count as crossing
+        self.lap_timer = None
+        
+        # Cornering arcs instead of stop-turn-go at the corners
+        self.CORNERING_ARCS = False
+        self.CORNER_RADIUS = self.PANEL_SIZE / 2  # cm, keeps the arc inside the corner panel
+        self.ARC_STEP = 15                        # degrees of heading change per arc chord
+        
+        # Racing line through the panel corridors, driven on planned speeds (takes precedence over cornering arcs)
+        self.RACING_LINE = False
+        self.CORRIDOR_MARGIN = 5  # cm kept free between the robot's centre and the panel edge
+        
+        # Pure-pursuit tracking of the waypoint polyline (replaces the segment loop)
+        self.PURE_PURSUIT = False
+        self.CONTROL_RATE = 25       # Hz
+        self.LOOKAHEAD = 30          # cm ahead on the path to steer at
+        self.waypoints = list(COURSE_WAYPOINTS)  # Course waypoints (clockwise from start/finish line)
         print("🤖 Sphero BOLT Autonomous Racer initialized")
         print(f"📏 Course: {self.COURSE_WIDTH}cm x {self.COURSE_HEIGHT}cm")
 
@@ -95,6 +195,10 @@ class SpheroRacer:
 
     def calibrate_heading(self, api) -> bool:
         """Manual calibration - set heading so 0° points to first segment"""
+        dispatcher = None
+        if self.PRIORITY_DISPATCH:
+            dispatcher = CommandDispatcher(api)
+            api = DispatchedAPI(dispatcher)
         try:
             print("\n🧭 CALIBRATION MODE")
             print("Position the Sphero behind the start/finish line")
@@ -123,6 +227,10 @@ class SpheroRacer:
         except Exception as e:
             print(f"❌ Calibration failed: {e}")
             return False
+        
+        finally:
+            if dispatcher is not None:
+                dispatcher.close()
 
     def calculate_distance(self, start_pos: Tuple[float, float], end_pos: Tuple[float, float]) -> float:
         """Calculate distance between two points"""
@@ -130,24 +238,449 @@ class SpheroRacer:
         dy = end_pos[1] - start_pos[1]
         return math.sqrt(dx*dx + dy*dy)
 
-    def move_to_waypoint(self, api, x: float, y: float, heading: float, speed: int) -> bool:
-        """Move to a specific waypoint"""
+    def log(self, message: str):
+        """Print a race message, charged to the 'printing' phase"""
+        with self.timer.phase("printing"):
+            print(message)
+
+    def wait(self, duration: float) -> float:
+        """Wait on the race timeline, charged to the 'sleeping' phase"""
+        with self.timer.phase("sleeping"):
+            return self.scheduler.wait(duration)
+
+    def race_waypoints(self) -> List[Tuple[float, float, float]]:
+        """Waypoints to drive this race (racing line or cornering arcs when enabled)"""
+        if self.RACING_LINE:
+            half_width = self.PANEL_SIZE / 2 - self.CORRIDOR_MARGIN
+            arcs = build_cornering_path(self.waypoints, self.CORNER_RADIUS, self.ARC_STEP)
+            line = optimize_racing_line(self.waypoints, half_width, model=self.robot_model, baseline=arcs)
+            if line is arcs:
+                print("🏎️ Racing line: no blend plans faster than the cornering arcs, driving those")
+            else:
+                print(f"🏎️ Racing line: {len(line)} waypoints, path {-line_gain(self.waypoints, line):+.1%} vs centre line")
+            return line
+        if self.CORNERING_ARCS:
+            return build_cornering_path(self.waypoints, self.CORNER_RADIUS, self.ARC_STEP)
+        return self.waypoints
+
+    def set_location_origin(self, api, waypoint: Tuple[float, float, float]):
+        """Anchor the locator to a course waypoint (robot must be standing on it)"""
+        location = api.get_location()
+        self.location_origin = (location['x'], location['y'], waypoint[0], waypoint[1])
+
+    def get_course_position(self, api) -> Tuple[float, float]:
+        """Read the locator and convert it to course coordinates
+        
+        The locator's y axis points along heading 0° (course +x) after calibration,
+        its x axis to the right of it (course -y).
+        """
+        state = self.course_state()
+        if state is not None:
+            return state[0], state[1]
+        return self.location_to_course(api.get_location())
+
+    def location_to_course(self, location) -> Tuple[float, float]:
+        """Convert a locator reading ({'x', 'y'} in cm) to course coordinates"""
+        loc_x, loc_y, course_x, course_y = self.location_origin
+        return (course_x + (location['y'] - loc_y), course_y - (location['x'] - loc_x))
+
+    def get_course_velocity(self, api) -> Tuple[float, float]:
+        """Read the velocity (cm/s) in course coordinates"""
+        state = self.course_state()
+        if state is not None:
+            return state[2], state[3]
+        velocity = api.get_velocity()
+        return velocity['y'], -velocity['x']
+
+    def uses_sensor_stream(self) -> bool:
+        return bool(self.SENSOR_STREAM or self.TELEMETRY_PATH or self.POSE_FILTER
+                    or self.lap_timer is not None)
+
+    def start_sensor_stream(self, api):
+        """Start streaming sensors into the ring buffer (kept after the race for logging)"""
+        if self.sensor_ring is None or self.sensor_ring.capacity != self.STREAM_CAPACITY:
+            self.sensor_ring = SensorRing(self.STREAM_CAPACITY)
+        self.stream = SensorStream(api, self.sensor_ring, clock=self.scheduler.clock)
+        mode = self.stream.start()
+        print(f"📶 Sensor {'stream' if mode == 'stream' else 'polling'} every "
+              f"{self.stream.interval * 1000:.0f}ms into a {self.STREAM_CAPACITY}-sample ring")
+
+    def start_pose_filter(self, waypoint: Tuple[float, float, float]):
+        """Start the pose filter on a waypoint and feed it every streamed sample"""
+        self.pose.reset(waypoint[0], waypoint[1], waypoint[2], self.scheduler.clock())
+        self.stream.listeners.append(self.fuse_sample)
+
+    def fuse_sample(self, sample: Tuple[float, ...]):
+        """Sensor stream listener: one predict/correct step of the pose filter"""
+        position = self.location_to_course({'x': sample[STREAM_INDEX['x']], 'y': sample[STREAM_INDEX['y']]})
+        velocity = sample[STREAM_INDEX['vy']], -sample[STREAM_INDEX['vx']]
+        self.pose.update(sample[STREAM_INDEX['t']], position, velocity,
+                         sample[STREAM_INDEX['gyro_z']], sample[STREAM_INDEX['accel_y']])
+
+    def time_lap(self, sample: Tuple[float, ...]):
+        """Sensor stream listener: check the sample for a finish line crossing"""
+        x, y = self.location_to_course({'x': sample[STREAM_INDEX['x']], 'y': sample[STREAM_INDEX['y']]})
+        self.lap_timer.update(sample[STREAM_INDEX['t']], x, y)
+
+    def report_laps(self):
+        """Log the laps completed since the last report"""
+        best = self.lap_timer.best_lap()
+        for lap, seconds in self.lap_timer.new_laps():
+            marker = " 🥇" if best is not None and best[0] == lap else ""
+            self.log(f"🏁 Lap {lap}: {seconds:.2f}s{marker}")
+
+    def stop_sensor_stream(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream = None
+
+    def open_telemetry(self):
+        """Start a telemetry file at the current point of the race timeline"""
+        path = self.TELEMETRY_PATH
+        if os.path.isdir(path):
+            path = os.path.join(path, time.strftime("race-%Y%m%d-%H%M%S.tlm"))
+        with self.telemetry_lock:
+            self.telemetry = TelemetryWriter(path)
+            self.telemetry_cursor = self.sensor_ring.written
+            self.telemetry_dropped = 0
+        self.stream.listeners.append(self.flush_telemetry)
+
+    def flush_telemetry(self, sample: Tuple[float, ...]):
+        """Sensor stream listener: write the ring out once it is half full, long segments included"""
+        if self.sensor_ring.written - self.telemetry_cursor >= self.sensor_ring.capacity // 2:
+            self.record_telemetry()
+
+    def record_telemetry(self):
+        """Write the samples streamed since the last call to the telemetry file"""
+        with self.telemetry_lock:
+            if self.telemetry is not None:
+                self._write_telemetry()
+
+    def _write_telemetry(self):
+        cursor = self.telemetry_cursor
+        rows, self.telemetry_cursor = self.sensor_ring.since(cursor)
+        self.telemetry_dropped += self.telemetry_cursor - cursor - len(rows)
+        fields = self.sensor_ring.fields
+        t, x, y, vx, vy, gyro_z, heading, speed = (
+            fields.index(name) for name in ("t", "x", "y", "vx", "vy", "gyro_z", "heading", "speed"))
+        origin = self.scheduler.origin
+        for row in rows:
+            course_x, course_y = self.location_to_course({'x': row[x], 'y': row[y]})
+            self.telemetry.write(row[t] - origin, course_x, course_y, row[heading], row[speed],
+                                 row[vy], -row[vx], row[gyro_z])
+
+    def close_telemetry(self):
+        with self.telemetry_lock:
+            if self.telemetry is None:
+                return
+            self._write_telemetry()
+            self.telemetry.close()
+            print(f"📝 Telemetry: {self.telemetry.records} samples written to {self.telemetry.path}")
+            if self.telemetry_dropped:
+                print(f"⚠️ Telemetry: {self.telemetry_dropped} samples overwritten in the ring before they were written")
+            self.telemetry = None
+
+    def start_segment(self, index: int, kind: str):
+        """Open a segment in the time breakdown and in the telemetry index"""
+        self.timer.start_segment(index, kind)
+        with self.telemetry_lock:
+            if self.telemetry is not None:
+                self._write_telemetry()
+                self.telemetry.mark_segment(index, kind, self.scheduler.now())
+
+    def stream_sample(self) -> Optional[dict]:
+        """Newest streamed sample, or None when not streaming or the stream went stale"""
+        if self.stream is None:
+            return None
+        return self.stream.latest(max_age=3 * self.stream.interval)
+
+    def course_state(self) -> Optional[Tuple[float, float, float, float]]:
+        """Course (x, y, vx, vy) from the pose filter or the sensor stream, None without a fresh stream"""
+        sample = self.stream_sample()
+        if sample is None:
+            return None
+        if self.POSE_FILTER:
+            return self.pose.position() + self.pose.velocity()
+        x, y = self.location_to_course(sample)
+        return x, y, sample['vy'], -sample['vx']
+
+    def anchor_on_wall(self, api, event: str) -> bool:
+        """Snap the position estimate across the course wall the robot touches"""
+        landmarks = self.landmarks
+        if landmarks is None or self.location_origin is None:
+            return False
+        x, y = self.get_course_position(api)
+        correction = landmarks.correction(x, y, event, api.get_heading())
+        if correction is None:
+            return False
+        if self.POSE_FILTER:
+            self.pose.shift(*correction)  # Only across the wall
+        dx, dy = (offset or 0.0 for offset in correction)
+        loc_x, loc_y, course_x, course_y = self.location_origin
+        self.location_origin = (loc_x, loc_y, course_x + dx, course_y + dy)
+        self.log(f"📌 Re-anchored across the wall at ({x + dx:.0f}, {y + dy:.0f}) after {event}: "
+                 f"{math.hypot(dx, dy):.1f}cm")
+        return True
+
+    def on_collision(self, api):
+        """Collision event handler: a bump into a course wall is a landmark"""
+        self.anchor_on_wall(api, "collision")
+
+    def command_lead(self, command: str) -> float:
+        """Seconds to send `command` early so it takes effect on time (0 without compensation)"""
+        if not self.LATENCY_COMPENSATION:
+            return 0.0
+        return self.latency.estimate(command)
+
+    def predict_course_position(self, api, command: str = "set_heading") -> Tuple[float, float]:
+        """Course position where the robot will be once `command` takes effect"""
+        x, y = self.get_course_position(api)
+        lead = self.command_lead(command)
+        if lead > 0:
+            vx, vy = self.get_course_velocity(api)
+            x, y = x + vx * lead, y + vy * lead
+        return x, y
+
+    def wait_for_boundary(self, duration: float, command: str = "set_heading"):
+        """Wait out `duration` of planned motion, returning early by the latency of the next command"""
+        lead = min(duration, self.command_lead(command))
+        self.wait(duration - lead)
+        self.scheduler.deadline += lead  # Keep the timeline on the planned boundary
+
+    def wait_for_waypoint(self, api, end_waypoint: Tuple[float, float, float],
+                          heading: float, timeout: float, tolerance: Optional[float] = None) -> bool:
+        """Poll the locator until the robot reaches the end of the current segment"""
+        deadline = self.scheduler.clock() + timeout
+        if tolerance is None:
+            tolerance = self.ARRIVAL_TOLERANCE
+        
+        while self.scheduler.clock() < deadline:
+            if self.remaining_distance(api, end_waypoint, heading) <= tolerance:
+                self.scheduler.sync()
+                return True
+            self.wait(self.POLL_INTERVAL)
+        
+        self.scheduler.sync()
+        self.log(f"⚠️ Waypoint ({end_waypoint[0]:.0f}, {end_waypoint[1]:.0f}) not reached within {timeout:.1f}s")
+        return False
+
+    def remaining_distance(self, api, end_waypoint: Tuple[float, float, float], heading: float) -> float:
+        """Distance still to go to the waypoint along the driving direction
+        
+        With latency compensation this is measured from where the robot will
+        be when the next heading command arrives.
+        """
+        x, y = self.predict_course_position(api)
+        dir_x = math.cos(math.radians(heading))
+        dir_y = -math.sin(math.radians(heading))
+        return (end_waypoint[0] - x) * dir_x + (end_waypoint[1] - y) * dir_y
+
+    def move_to_waypoint(self, api, x: float, y: float, heading: float, speed: int,
+                         settle: bool = True) -> bool:
+        """Move to a specific waypoint (`settle`: give the heading a moment before the speed)"""
         try:
-            print(f"🎯 Moving to ({x:.0f}, {y:.0f}) at heading {heading}° with speed {speed}")
+            heading = int(round(normalize_heading(heading))) % 360
+            self.log(f"🎯 Moving to ({x:.0f}, {y:.0f}) at heading {heading}° with speed {speed}")
             
             # Set heading and speed
+            if self.CONTINUOUS_MOTION and hasattr(api, "drive"):
+                api.drive(heading, speed)  # One packet when both change
+                return True
             api.set_heading(heading)
-            time.sleep(0.1)  # Small delay for heading adjustment
+            if settle and not self.CONTINUOUS_MOTION:
+                self.wait(0.1)  # Small delay for heading adjustment
             api.set_speed(speed)
             return True
             
         except Exception as e:
-            print(f"❌ Movement error: {e}")
+            self.log(f"❌ Movement error: {e}")
+            return False
+
+    def run_pure_pursuit(self, api, waypoints: List[Tuple[float, float, float]]) -> bool:
+        """Track the waypoint polyline with pure pursuit at a fixed control rate"""
+        tracker = PurePursuitTracker(waypoints, self.LOOKAHEAD, self.ARRIVAL_TOLERANCE)
+        period = 1.0 / self.CONTROL_RATE
+        timeout = self.scheduler.clock() + 3 * tracker.length / self.segment_velocity(self.TURN_SPEED, turning=True)
+        heading, speed = None, None
+        self.log(f"🎯 Pure pursuit over {tracker.length:.0f}cm at {self.CONTROL_RATE}Hz, "
+              f"lookahead {self.LOOKAHEAD}cm")
+        
+        while not tracker.finished():
+            if self.scheduler.clock() > timeout:
+                self.log("❌ Pure pursuit timed out before reaching the finish")
+                return False
+            
+            x, y = self.predict_course_position(api)
+            target_heading, turn_ahead = tracker.update(x, y)
+            target_heading = int(round(target_heading)) % 360
+            
+            target_speed = self.pursuit_speed(turn_ahead)
+            
+            if heading is None or shortest_turn(heading, target_heading) != 0:
+                api.set_heading(target_heading)
+                heading = target_heading
+            if target_speed != speed:
+                api.set_speed(target_speed)
+                speed = target_speed
+            
+            self.wait(period)
+        
+        self.total_distance += tracker.length
+        return True
+
+    def pursuit_speed(self, turn_ahead: float) -> int:
+        """Speed for pure pursuit given the path's heading change within the lookahead window"""
+        if is_turn(0, turn_ahead):
+            return self.TURN_SPEED
+        if turn_ahead > 5:
+            return self.APPROACH_SPEED
+        return self.STRAIGHT_SPEED
+
+    def run_race_async(self, api, wait_for_start: bool = False) -> bool:
+        """Run the race on the asyncio engine (sensors, control, logging and input as tasks)"""
+        if not self.calibrated:
+            print("❌ Robot not calibrated! Run calibrate_heading() first.")
+            return False
+        if self.SURFACE and self.speed_table is None:
+            self.load_speed_calibration()
+        return asyncio.run(AsyncRaceEngine(self, api).run(wait_for_start))
+
+    def drive_profile(self, api, end_waypoint: Tuple[float, float, float], profile: SegmentProfile):
+        """Follow a planned speed profile until the end of the segment"""
+        end_x, end_y, end_heading = end_waypoint
+        model = self.robot_model
+        self.log(f"📈 Profile: {profile.v_entry:.0f} → {profile.v_peak:.0f} → {profile.v_exit:.0f} cm/s "
+              f"in {profile.duration:.2f}s")
+        
+        # Never command less than corner speed, or the robot would not start moving
+        floor = model.corner_speed
+        speed = model.to_speed(max(floor, profile.speed_at(self.PROFILE_STEP)))
+        start = self.scheduler.deadline
+        self.move_to_waypoint(api, end_x, end_y, end_heading, speed,
+                              settle=not self.is_arc_chord(profile.start, end_waypoint))
+        timeout = 2 * profile.duration + 1
+        # Speed changes are sent early by their latency, the segment ends early for the next heading
+        speed_lead = self.command_lead("set_speed")
+        end_lead = min(profile.duration, self.command_lead("set_heading"))
+        
+        while True:
+            # Closed loop runs on the clock, timed mode on the planned timeline
+            if self.CLOSED_LOOP:
+                elapsed = self.scheduler.clock() - start
+            else:
+                elapsed = self.scheduler.deadline - start
+            if self.CLOSED_LOOP:
+                remaining = self.remaining_distance(api, end_waypoint, end_heading)
+                if remaining <= self.ARRIVAL_TOLERANCE:
+                    self.scheduler.sync()
+                    break
+                if elapsed > timeout:
+                    self.scheduler.sync()
+                    self.log(f"⚠️ Waypoint ({end_x:.0f}, {end_y:.0f}) not reached within {timeout:.1f}s")
+                    break
+                velocity = profile.speed_at_distance(profile.distance - remaining)
+                step = self.POLL_INTERVAL
+            else:
+                if elapsed >= profile.duration - end_lead - 1e-6:
+                    self.scheduler.deadline += end_lead  # Back on the planned boundary
+                    break
+                velocity = profile.speed_at(elapsed + self.PROFILE_STEP + speed_lead)
+                step = min(self.PROFILE_STEP, profile.duration - end_lead - elapsed)
+            
+            new_speed = model.to_speed(max(floor, velocity))
+            if new_speed != speed:
+                api.set_speed(new_speed)
+                speed = new_speed
+            self.wait(step)
+
+    def segment_velocity(self, speed: int, turning: bool = False) -> float:
+        """Expected cm/s at a speed command: the calibrated table, else the old estimates"""
+        return expected_velocity(speed, turning, self.speed_table)
+
+    def use_speed_table(self, table):
+        """Use a measured speed table for durations and the speed-profile planner"""
+        self.speed_table = table
+        self.robot_model.speed_table = table
+
+    def load_speed_calibration(self) -> bool:
+        """Load the calibration of SURFACE, if there is one"""
+        table = load_speed_table(self.SURFACE, self.SPEED_TABLE_PATH)
+        if table is None:
+            print(f"⚠️ No speed calibration for surface '{self.SURFACE}' in {self.SPEED_TABLE_PATH}")
+            return False
+        self.use_speed_table(table)
+        print(f"📐 Speed calibration for '{self.SURFACE}': speed {self.STRAIGHT_SPEED} = "
+              f"{table.to_cms(self.STRAIGHT_SPEED):.0f} cm/s")
+        return True
+
+    def calibrate_speed_table(self, api) -> bool:
+        """Measure the speed -> cm/s table with a sweep and store it for SURFACE"""
+        try:
+            surface = self.SURFACE or "default"
+            print(f"\n📐 SPEED CALIBRATION on '{surface}' (needs about 3.5m of free straight)")
+            api.set_main_led(Color(0, 255, 255))
+            table = calibrate_speeds(api)
+            save_speed_table(table, surface, self.SPEED_TABLE_PATH)
+            self.use_speed_table(table)
+            print(f"✅ Speed calibration saved to {self.SPEED_TABLE_PATH}")
+            return True
+        except Exception as e:
+            print(f"❌ Speed calibration failed: {e}")
+            api.set_speed(0)
+            return False
+
+    def load_turn_calibration(self) -> bool:
+        """Load the turn characterization of SURFACE, if there is one"""
+        table = load_turn_table(self.SURFACE, self.TURN_TABLE_PATH)
+        if table is None:
+            print(f"⚠️ No turn characterization for surface '{self.SURFACE}' in {self.TURN_TABLE_PATH}")
+            return False
+        self.turn_table = table
+        print(f"📐 Turn characterization for '{self.SURFACE}': 90° in place = {table.duration(90, 0):.2f}s")
+        return True
+
+    def characterize_turn_table(self, api) -> bool:
+        """Measure turn durations by angle and entry speed and store them for SURFACE"""
+        try:
+            surface = self.SURFACE or "default"
+            print(f"\n🔄 TURN CHARACTERIZATION on '{surface}' (needs about 2m of free floor)")
+            api.set_main_led(Color(0, 255, 255))
+            self.turn_table = characterize_turns(api)
+            save_turn_table(self.turn_table, surface, self.TURN_TABLE_PATH)
+            print(f"✅ Turn characterization saved to {self.TURN_TABLE_PATH}")
+            return True
+        except Exception as e:
+            print(f"❌ Turn characterization failed: {e}")
+            api.set_speed(0)
             return False
 
+    def wait_for_turn(self, api, turn: float, profile: Optional[SegmentProfile] = None):
+        """Wait until a turn in place is done
+        
+        Gyro-confirmed with TURN_SETTLE, else as long as the turn table, the
+        speed profile or (without either) the old flat 0.5s says.
+        """
+        if self.TURN_SETTLE:
+            with self.timer.phase("sleeping"):
+                wait_for_settle(api, 0.1, self.TURN_TIMEOUT, self.scheduler.wait, self.scheduler.clock,
+                                self.POLL_INTERVAL)
+            self.scheduler.sync()
+            return
+        if self.turn_table is not None:
+            duration = self.turn_table.duration(turn, api.get_speed())
+        elif profile is not None:
+            duration = profile.duration
+        else:
+            duration = 0.5
+        self.wait_for_boundary(duration)
+
     def execute_segment(self, api, start_waypoint: Tuple[float, float, float], 
-                       end_waypoint: Tuple[float, float, float]) -> bool:
-        """Execute movement between two waypoints"""
+                       end_waypoint: Tuple[float, float, float],
+                       profile: Optional[SegmentProfile] = None, index: Optional[int] = None) -> bool:
+        """Execute movement between two waypoints (optionally along a planned speed profile)
+        
+        `index` is the segment's position in the lap, for the learned corrections.
+        """
         try:
             start_x, start_y, start_heading = start_waypoint
             end_x, end_y, end_heading = end_waypoint
@@ -156,73 +689,224 @@ class SpheroRacer:
             distance = self.calculate_distance((start_x, start_y), (end_x, end_y))
             
             if distance < 1:  # Turn in place (same coordinates, different heading)
-                print(f"🔄 Turning in place to heading {end_heading}°")
-                api.set_heading(end_heading)
-                time.sleep(0.5)  # Time for turn to complete
+                turn = shortest_turn(start_heading, end_heading)
+                self.log(f"🔄 Turning in place to heading {end_heading}° "
+                      f"({abs(turn):.0f}° {turn_direction(start_heading, end_heading)})")
+                api.set_heading(int(round(normalize_heading(end_heading))) % 360)
+                if not self.CONTINUOUS_MOTION:
+                    self.wait_for_turn(api, turn, profile)
+                    # The robot is past the corner, but its heading is known once the turn is done
+                    if self.landmarks is not None and self.POSE_FILTER:
+                        self.pose.fix_heading(end_heading)
+                return True
+            
+            if profile is not None:
+                self.drive_profile(api, end_waypoint, profile)
+                self.total_distance += distance
                 return True
             
-            # Regular movement segment
-            if abs(end_heading - start_heading) > 45:  # Turn segment
-                speed = self.TURN_SPEED
-                duration = distance / (speed * 0.6)  # Slower for turns
-            else:  # Straight segment
-                speed = self.STRAIGHT_SPEED
-                duration = distance / (speed * 0.8)  # Estimate duration
+            # Regular movement segment: straight, turn or cornering-arc chord
+            kind = segment_class(start_heading, end_heading, distance, self.PANEL_SIZE)
+            chord = kind == APPROACH
+            speed = {STRAIGHT: self.STRAIGHT_SPEED, TURN: self.TURN_SPEED, APPROACH: self.APPROACH_SPEED}[kind]
+            turning = kind == TURN
+            
+            # Corrections learned on earlier laps of the session
+            extra = 0.0
+            if self.learner is not None and index is not None:
+                speed = max(1, min(self.robot_model.max_speed, int(round(speed + self.learner.speed[index]))))
+                extra = self.learner.distance[index]
+            duration = max(0.0, distance + extra) / self.segment_velocity(speed, turning)
             
-            print(f"📏 Segment distance: {distance:.1f}cm, Duration: {duration:.1f}s")
+            self.log(f"📏 Segment distance: {distance:.1f}cm, Duration: {duration:.1f}s")
             
             # Execute movement
-            self.move_to_waypoint(api, end_x, end_y, end_heading, speed)
+            self.move_to_waypoint(api, end_x, end_y, end_heading, speed, settle=not chord)  # Arcs sweep on
             
             # Wait for segment completion
-            time.sleep(duration)
+            if self.CLOSED_LOOP:
+                self.wait_for_waypoint(api, end_waypoint, end_heading, timeout=2 * duration + 1,
+                                       tolerance=self.ARRIVAL_TOLERANCE - extra)
+            else:
+                self.wait_for_boundary(duration)
             
             self.total_distance += distance
             return True
             
         except Exception as e:
-            print(f"❌ Segment execution failed: {e}")
+            self.log(f"❌ Segment execution failed: {e}")
             return False
 
-    def run_race(self, api) -> bool:
-        """Execute the complete race course"""
+    def is_arc_chord(self, start_waypoint: Tuple[float, float, float],
+                     end_waypoint: Tuple[float, float, float]) -> bool:
+        """Whether the segment is a chord of a cornering arc (driven as one continuous sweep)"""
+        distance = self.calculate_distance(start_waypoint[:2], end_waypoint[:2])
+        return distance >= 1 and segment_class(start_waypoint[2], end_waypoint[2], distance,
+                                               self.PANEL_SIZE) == APPROACH
+
+    def run_session(self, api, laps: int) -> bool:
+        """Race `laps` laps back to back, learning per-segment corrections after every lap
+        
+        Corrections are stored per surface, segment count and driving mode and
+        picked up again by the next session.
+        """
+        segments = len(self.race_waypoints()) - 1
+        mode = ("closed" if self.CLOSED_LOOP else "timed") + ("-continuous" if self.CONTINUOUS_MOTION else "")
+        key = learning_key(self.SURFACE, segments, mode)
+        self.learner = LapLearner(segments)
+        if load_learner(self.learner, key, self.LEARNING_PATH):
+            print(f"🧠 Corrections loaded from {self.learner.laps()} earlier laps")
+        try:
+            for lap in range(1, laps + 1):
+                print(f"\n🔁 LAP {lap}/{laps}")
+                self.total_distance = 0.0
+                self.learner.begin_lap(ROLLING if lap > 1 else STANDING)
+                if not self.run_race(api, from_finish=lap > 1):
+                    return False
+                self.learner.end_lap(self.race_time)
+                save_learner(self.learner, key, self.LEARNING_PATH)
+                print(f"🧠 Lap {lap}: {self.race_time:.2f}s (best {self.learner.start} {self.learner.best_time():.2f}s), "
+                      f"corrections saved to {self.LEARNING_PATH}")
+            return True
+        finally:
+            self.learner = None
+
+    def observe_segment(self, api, index: int, start_point: Tuple[float, float, float],
+                        end_point: Tuple[float, float, float],
+                        start_position: Optional[Tuple[float, float]] = None):
+        """Feed the end-point error of a finished segment to the learner
+        
+        Timed segments only control how far they drive, so they are measured
+        from where they actually started (`start_position`) instead of from
+        the waypoint, and earlier drift does not count against them.
+        """
+        start, end = start_point[:2], end_point[:2]
+        if start_position is not None:
+            dx, dy = start_position[0] - start[0], start_position[1] - start[1]
+            start, end = start_position, (end[0] + dx, end[1] + dy)
+        along, cross = end_point_error(start, end, self.get_course_position(api))
+        self.learner.observe(index, along, cross)
+
+    def run_race(self, api, from_finish: bool = False, laps: int = 1) -> bool:
+        """Execute the complete race course
+        
+        With `from_finish` the robot is still on the finish line of the previous
+        lap: the lap starts there and keeps the previous lap's locator origin.
+        With `laps` > 1 the laps are driven back to back without stopping and
+        timed on the finish line crossings.
+        """
+        dispatcher = None
         try:
             if not self.calibrated:
-                print("❌ Robot not calibrated! Run calibrate_heading() first.")
+                self.log("❌ Robot not calibrated! Run calibrate_heading() first.")
                 return False
             
-            print("\n🏁 Starting autonomous race!")
-            print("Course: Clockwise navigation")
+            self.log("\n🏁 Starting autonomous race!")
+            self.log("Course: Clockwise navigation")
+            
+            if self.SURFACE and self.speed_table is None:
+                self.load_speed_calibration()
+            if self.SURFACE and self.turn_table is None and not self.TURN_SETTLE:
+                self.load_turn_calibration()
+            
+            waypoints = self.race_waypoints()
+            if from_finish:
+                waypoints = [(waypoints[-1][0], waypoints[-1][1], waypoints[0][2])] + waypoints[1:]
+            if laps > 1:
+                finish = waypoints[-1]
+                self.lap_timer = LapTimer(finish[:2], finish[2], self.FINISH_HALF_WIDTH)
+                waypoints = chain_laps(waypoints, laps)
+            needs_location = (self.CLOSED_LOOP or self.PURE_PURSUIT or self.uses_sensor_stream()
+                              or self.learner is not None)
+            if needs_location and not (from_finish and self.location_origin is not None):
+                self.set_location_origin(api, waypoints[0])
+            if self.uses_sensor_stream():
+                self.start_sensor_stream(api)
+            if self.POSE_FILTER:
+                self.start_pose_filter(waypoints[0])
+            if self.lap_timer is not None:
+                self.stream.listeners.append(self.time_lap)
+            if self.LANDMARK_RESET:
+                if self.location_origin is None:
+                    self.set_location_origin(api, waypoints[0])
+                self.landmarks = LandmarkAnchor(self.waypoints, self.PANEL_SIZE / 2, self.ROBOT_RADIUS,
+                                                self.LANDMARK_RADIUS)
+                if hasattr(api, "register_event"):
+                    api.register_event(EventType.on_collision, self.on_collision)
+            
+            profiles = None
+            if self.SPEED_PROFILE or self.RACING_LINE:  # A racing line is only as fast as its planned speeds
+                profiles = plan_speed_profile(waypoints, self.robot_model)
+                self.log(f"📈 Planned lap time: {lap_time(profiles):.2f}s")
             
             # Set racing LED (purple)
             api.set_main_led(Color(255, 0, 255))
             
-            # Start timer
-            self.start_time = time.time()
+            # Start timer (all race waits are deadlines on this timeline)
+            self.start_time = self.scheduler.start()
+            self.timer.start_race()
+            self.profiler.reset()
+            if self.lap_timer is not None:
+                self.lap_timer.start(self.start_time, waypoints[0][0], waypoints[0][1])
+            if self.TELEMETRY_PATH:
+                self.open_telemetry()
+            # Profiled below the redundancy filter: only calls that reach the link are measured
+            api = ProfiledAPI(api, self.profiler)
+            state = None
+            if self.SUPPRESS_REDUNDANT:
+                api = state = StatefulAPI(api)
+            if self.PRIORITY_DISPATCH:
+                dispatcher = CommandDispatcher(api)
+                api = DispatchedAPI(dispatcher)
+            api = TimedAPI(api, self.timer)
             
-            # Execute each segment
-            for i in range(len(self.waypoints) - 1):
-                segment_start = time.time()
-                start_point = self.waypoints[i]
-                end_point = self.waypoints[i + 1]
-                
-                print(f"\n📍 Segment {i+1}/{len(self.waypoints)-1}")
-                
-                if not self.execute_segment(api, start_point, end_point):
-                    print(f"❌ Failed to execute segment {i+1}")
+            if self.PURE_PURSUIT:
+                self.start_segment(1, "moving")
+                if not self.run_pure_pursuit(api, waypoints):
                     return False
-                
-                segment_time = time.time() - segment_start
-                print(f"⏱️ Segment completed in {segment_time:.2f}s")
-                
-                # Brief pause between segments for stability
-                time.sleep(0.2)
+            else:
+                # Execute each segment
+                for i in range(len(waypoints) - 1):
+                    segment_start = self.scheduler.clock()
+                    start_point = waypoints[i]
+                    end_point = waypoints[i + 1]
+                    moving = self.calculate_distance(start_point[:2], end_point[:2]) >= 1
+                    self.start_segment(i + 1, "moving" if moving else "turning")
+                    
+                    self.log(f"\n📍 Segment {i+1}/{len(waypoints)-1}")
+                    
+                    profile = profiles[i] if profiles else None
+                    learning = self.learner is not None and moving and profile is None
+                    start_position = None
+                    if learning and not self.CLOSED_LOOP:
+                        start_position = self.get_course_position(api)
+                    if not self.execute_segment(api, start_point, end_point, profile, i):
+                        self.log(f"❌ Failed to execute segment {i+1}")
+                        return False
+                    if learning:
+                        self.observe_segment(api, i, start_point, end_point, start_position)
+                    
+                    segment_time = self.scheduler.clock() - segment_start
+                    self.log(f"⏱️ Segment completed in {segment_time:.2f}s")
+                    if self.lap_timer is not None:
+                        self.report_laps()
+                    
+                    # Brief pause between segments for stability, except into, along and out of an arc
+                    arc = self.is_arc_chord(start_point, end_point) or (
+                        i + 2 < len(waypoints) and self.is_arc_chord(end_point, waypoints[i + 2]))
+                    if not self.CONTINUOUS_MOTION and not arc:
+                        self.wait(0.2)
             
             # Stop at finish line
+            self.timer.end_segment()
             api.set_speed(0)
             
             # Calculate race results
-            race_time = time.time() - self.start_time
+            race_time = self.race_time = self.scheduler.clock() - self.start_time
+            self.timer.end_race()
+            if self.lap_timer is not None:
+                self.lap_timer.finish(self.start_time + race_time, laps)
+                self.report_laps()
             avg_speed = self.total_distance / race_time if race_time > 0 else 0
             
             # Victory LED (gold)
@@ -232,6 +916,26 @@ class SpheroRacer:
             print(f"⏱️ Total time: {race_time:.2f} seconds")
             print(f"📏 Total distance: {self.total_distance:.1f} cm")
             print(f"🚀 Average speed: {avg_speed:.1f} cm/s")
+            print(f"🕒 Worst deadline overshoot: {self.scheduler.max_lateness * 1000:.1f} ms")
+            if self.lap_timer is not None and self.lap_timer.laps:
+                best_lap, best_time = self.lap_timer.best_lap()
+                splits = ", ".join(f"{seconds:.2f}s" for seconds in self.lap_timer.laps)
+                print(f"🏁 Laps: {splits}")
+                print(f"🥇 Best lap: {best_time:.2f}s (lap {best_lap})")
+            if self.landmarks is not None:
+                print(f"📌 Landmarks: {len(self.landmarks.corrections)} wall fixes, "
+                      f"largest {self.landmarks.max_correction():.1f}cm")
+            if self.POSE_FILTER:
+                print(f"🧭 Pose filter: ±{self.pose.uncertainty():.1f}cm, "
+                      f"{self.pose.rejected} locator readings rejected")
+            self.print_breakdown()
+            self.print_latency()
+            if state is not None:
+                print(f"✂️ Commands: {state.sent} sent, {state.suppressed} suppressed, "
+                      f"{state.merged} heading+speed pairs merged")
+            if dispatcher is not None:
+                print(f"📨 Dispatcher: {dispatcher.coalesced} LED commands coalesced, "
+                      f"{dispatcher.dropped} telemetry requests served from cache")
             
             return True
             
@@ -239,6 +943,34 @@ class SpheroRacer:
             print(f"❌ Race failed: {e}")
             self.emergency_stop(api)
             return False
+        
+        finally:
+            if dispatcher is not None:
+                dispatcher.close()
+            self.close_telemetry()
+            self.stop_sensor_stream()
+            self.landmarks = None  # Late collision events are ignored
+            self.lap_timer = None
+
+    def print_breakdown(self):
+        """Print where the race time went and write the JSON report if requested"""
+        report = self.timer.report()
+        total = report['total']
+        for title, split in (("by segment kind", report['by_kind']), ("by phase", report['by_phase'])):
+            print(f"📊 Time breakdown {title}:")
+            for name, seconds in split.items():
+                share = seconds / total if total > 0 else 0
+                print(f"   {name:<17} {seconds:6.2f}s  {share:5.1%}")
+        if self.REPORT_PATH:
+            self.timer.write_report(self.REPORT_PATH)
+            print(f"📝 Per-segment report written to {self.REPORT_PATH}")
+
+    def print_latency(self):
+        """Print the per-command latency percentiles and export the histograms if requested"""
+        self.profiler.print_summary()
+        if self.LATENCY_REPORT_PATH:
+            self.profiler.write_report(self.LATENCY_REPORT_PATH)
+            print(f"📝 Latency histograms written to {self.LATENCY_REPORT_PATH}")
 
     def emergency_stop(self, api):
         """Emergency stop function"""
@@ -289,6 +1021,13 @@ def main(toy_name, joystick=None, playerid=None):
             api.set_main_led(Color(0, 0, 255))  # Blue LED - connected
             print("✅ Successfully connected to Sphero BOLT!")
             
+            # Optional: measure speed -> cm/s and turn times on this surface (drives up to ~3.5m),
+            # before the heading calibration so the robot is put back on the start
+            if racer.CALIBRATE_SPEEDS and not racer.calibrate_speed_table(api):
+                return False
+            if racer.CHARACTERIZE_TURNS and not racer.characterize_turn_table(api):
+                return False
+            
             # Step 3: Calibrate heading
             if not racer.calibrate_heading(api):
                 print("❌ Failed to calibrate robot")
@@ -297,10 +1036,19 @@ def main(toy_name, joystick=None, playerid=None):
             # Step 4: Final preparation
             print("\n🏁 Ready to race!")
             print("Press ENTER to start the autonomous race...")
-            input()
             
             # Step 5: Execute race
-            success = racer.run_race(api)
+            if racer.ASYNC_ENGINE:
+                success = racer.run_race_async(api, wait_for_start=True)
+            elif racer.LAPS > 1 and racer.SEAMLESS_LAPS:
+                input()
+                success = racer.run_race(api, laps=racer.LAPS)
+            elif racer.LAPS > 1:
+                input()
+                success = racer.run_session(api, racer.LAPS)
+            else:
+                input()
+                success = racer.run_race(api)
             
             if success:
                 print("\n✅ Autonomous race completed successfully!")
@@ -0,0 +1,223 @@
+"""
+asyncio race engine
+Sensor sampling, the control loop, logging and user input run as independent
+tasks; every API call goes through the one link the engine owns
+"""
+
+import asyncio
+import functools
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from spherov2.types import Color
+
+from instrumentation import ProfiledAPI
+from pure_pursuit import PurePursuitTracker
+
+
+class EnterKey:
+    """The one blocking stdin reader, shared by every race; ENTER goes to the race attached at the time
+
+    The reader thread outlives the event loop of a race, so lines read while
+    no race is attached (or after its loop closed) are dropped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._target: Optional[Tuple[asyncio.AbstractEventLoop, Callable[[], None]]] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop, callback: Callable[[], None]):
+        """Deliver ENTER to `callback` on `loop`, starting the reader on first use"""
+        with self._lock:
+            self._target = (loop, callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._read, name="stdin-reader", daemon=True)
+                self._thread.start()
+
+    def detach(self):
+        with self._lock:
+            self._target = None
+
+    def _read(self):
+        for _ in sys.stdin:
+            with self._lock:
+                target = self._target
+            if target is None:
+                continue
+            loop, callback = target
+            try:
+                loop.call_soon_threadsafe(callback)
+            except RuntimeError:
+                pass  # The loop closed between the read and the call
+
+
+ENTER_KEY = EnterKey()
+
+
+class AsyncRaceEngine:
+    """Runs one race of a SpheroRacer as a set of asyncio tasks"""
+
+    def __init__(self, racer, api):
+        self.racer = racer
+        self.device = api
+        self.api = ProfiledAPI(api, racer.profiler)
+        # One worker thread: API calls never overlap on the BLE link
+        self.link = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sphero-link")
+        self.pose: Optional[Tuple[float, float, float, float, float]] = None  # (t, x, y, vx, vy)
+
+    async def call(self, name: str, *args):
+        """Run an API call on the link thread without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.link, functools.partial(getattr(self.api, name), *args))
+
+    def log(self, message: str):
+        self.log_queue.put_nowait(message)
+
+    # --- Tasks ---
+
+    async def logger_task(self):
+        """Print queued messages so the control loop never waits on the console"""
+        while True:
+            message = await self.log_queue.get()
+            if message is None:
+                return
+            print(message)
+
+    def on_enter(self):
+        """ENTER starts the race, the next ENTER aborts it"""
+        if not self.start.is_set():
+            self.start.set()
+        elif not self.stop.is_set():
+            self.log("🛑 Abort requested")
+            self.stop.set()
+
+    async def sensor_task(self):
+        """Sample locator and velocity at SENSOR_RATE into self.pose
+
+        With a sensor stream running the samples come from its ring buffer
+        (or the pose filter) and the link stays free for motion commands.
+        """
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.racer.SENSOR_RATE
+        next_tick = loop.time()
+        while not self.stop.is_set():
+            state = self.racer.course_state()
+            if state is None:
+                location = await self.call("get_location")
+                velocity = await self.call("get_velocity")
+                state = self.racer.location_to_course(location) + (velocity['y'], -velocity['x'])
+            self.pose = (loop.time(),) + state
+            self.pose_ready.set()
+            next_tick = max(next_tick + period, loop.time())
+            await asyncio.sleep(next_tick - loop.time())
+
+    async def control_task(self, waypoints) -> bool:
+        """Pure pursuit on the latest sampled pose at CONTROL_RATE"""
+        racer = self.racer
+        loop = asyncio.get_running_loop()
+        tracker = PurePursuitTracker(waypoints, racer.LOOKAHEAD, racer.ARRIVAL_TOLERANCE)
+        period = 1.0 / racer.CONTROL_RATE
+        deadline = loop.time() + 3 * tracker.length / racer.segment_velocity(racer.TURN_SPEED, turning=True)
+        heading, speed = None, None
+        self.log(f"🎯 Async pure pursuit over {tracker.length:.0f}cm at {racer.CONTROL_RATE}Hz")
+
+        await self.pose_ready.wait()
+        next_tick = loop.time()
+        while not tracker.finished():
+            if self.stop.is_set():
+                return False
+            if loop.time() > deadline:
+                self.log("❌ Race timed out before reaching the finish")
+                return False
+
+            _, x, y, vx, vy = self.pose
+            lead = racer.command_lead("set_heading")
+            target_heading, turn_ahead = tracker.update(x + vx * lead, y + vy * lead)
+            target_heading = int(round(target_heading)) % 360
+            target_speed = racer.pursuit_speed(turn_ahead)
+
+            if target_heading != heading:
+                await self.call("set_heading", target_heading)
+                heading = target_heading
+            if target_speed != speed:
+                await self.call("set_speed", target_speed)
+                speed = target_speed
+
+            next_tick = max(next_tick + period, loop.time())
+            await asyncio.sleep(next_tick - loop.time())
+
+        racer.total_distance += tracker.length
+        return True
+
+    # --- Race ---
+
+    async def run(self, wait_for_start: bool = False) -> bool:
+        racer = self.racer
+        loop = asyncio.get_running_loop()
+        self.log_queue: asyncio.Queue = asyncio.Queue()
+        self.start = asyncio.Event()
+        self.stop = asyncio.Event()
+        self.pose_ready = asyncio.Event()
+        logger = asyncio.create_task(self.logger_task())
+        ENTER_KEY.attach(loop, self.on_enter)
+
+        success = False
+        try:
+            if wait_for_start:
+                await self.start.wait()
+            else:
+                self.start.set()
+
+            waypoints = racer.race_waypoints()
+            await loop.run_in_executor(self.link, racer.set_location_origin, self.api, waypoints[0])
+            if racer.uses_sensor_stream():
+                racer.start_sensor_stream(self.device)
+            if racer.POSE_FILTER:
+                racer.start_pose_filter(waypoints[0])
+            racer.profiler.reset()
+
+            self.log("\n🏁 Starting autonomous race! (ENTER aborts)")
+            await self.call("set_main_led", Color(255, 0, 255))
+            start_time = loop.time()
+            racer.scheduler.start()  # Telemetry timestamps count from here
+            if racer.TELEMETRY_PATH:
+                racer.open_telemetry()
+                racer.start_segment(1, "moving")
+
+            sensors = asyncio.create_task(self.sensor_task())
+            try:
+                success = await self.control_task(waypoints)
+            finally:
+                self.stop.set()
+                await sensors
+                await self.call("set_speed", 0)
+
+            race_time = loop.time() - start_time
+            if success:
+                await self.call("set_main_led", Color(255, 215, 0))
+                avg_speed = racer.total_distance / race_time if race_time > 0 else 0
+                self.log(f"\n🏆 RACE COMPLETE!")
+                self.log(f"⏱️ Total time: {race_time:.2f} seconds")
+                self.log(f"📏 Total distance: {racer.total_distance:.1f} cm")
+                self.log(f"🚀 Average speed: {avg_speed:.1f} cm/s")
+            else:
+                await self.call("set_main_led", Color(255, 0, 0))
+            return success
+
+        except Exception as e:
+            self.log(f"❌ Race failed: {e}")
+            await loop.run_in_executor(self.link, racer.emergency_stop, self.api)
+            return False
+
+        finally:
+            ENTER_KEY.detach()
+            self.log_queue.put_nowait(None)
+            await logger
+            self.link.shutdown(wait=True)
+            racer.close_telemetry()
+            racer.stop_sensor_stream()
+            if success:
+                racer.print_latency()
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Batched race simulator
+Steps N virtual racers in NumPy arrays through the segment loop of run_race,
+with the same kinematic model as sphero_sim, for parameter searches
+"""
+
+import ast
+import functools
+import math
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from course import COURSE_WAYPOINTS, Point, Waypoint, centre_line
+from headings import normalize_heading
+from segment_plan import APPROACH, STRAIGHT, TURN, expected_velocity, segment_class
+from telemetry_analysis import cross_track_error
+
+# Racer settings a configuration may override, with SpheroRacer's defaults
+DEFAULT_SETTINGS: Dict[str, object] = {
+    'STRAIGHT_SPEED': 80,
+    'TURN_SPEED': 40,
+    'APPROACH_SPEED': 60,
+    'PANEL_SIZE': 50,
+    'CLOSED_LOOP': False,
+    'CONTINUOUS_MOTION': False,
+    'ARRIVAL_TOLERANCE': 3,
+    'POLL_INTERVAL': 0.02,
+    'waypoints': COURSE_WAYPOINTS,
+}
+# Speed setting that drives each segment class
+SPEED_SETTINGS = {STRAIGHT: 'STRAIGHT_SPEED', TURN: 'TURN_SPEED', APPROACH: 'APPROACH_SPEED'}
+
+TURN_WAIT = 0.5      # s execute_segment waits after a turn in place (no turn table or settle)
+HEADING_WAIT = 0.1   # s move_to_waypoint waits between heading and speed
+SEGMENT_PAUSE = 0.2  # s run_race pauses between segments
+
+# Operations of the compiled segment loop and their arguments:
+#   HEADING heading | SPEED speed | WAIT seconds | END
+#   ARRIVE end x, end y, cos/-sin of the heading, tolerance, poll interval, timeout
+HEADING, SPEED, WAIT, ARRIVE, END = range(5)
+ARGS = 7
+
+
+class LapProgram:
+    """The API calls and waits run_race makes for one lap, with the speeds left open
+
+    Speed commands and segment durations depend on the speed settings and
+    are filled in per configuration: `speed_ops` lists (op, setting),
+    `travel_ops` (op, distance, setting, turning) for the timed waits and
+    the closed-loop timeouts.
+    """
+
+    def __init__(self):
+        self.ops: List[Tuple[float, ...]] = []
+        self.speed_ops: List[Tuple[int, str]] = []
+        self.travel_ops: List[Tuple[int, float, str, bool]] = []
+
+    def add(self, code: int, *args: float) -> int:
+        self.ops.append((code,) + args + (0.0,) * (ARGS - len(args)))
+        return len(self.ops) - 1
+
+    def fill(self, settings: Sequence[Dict[str, object]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Operation codes (G, K) and arguments (G, K, ARGS) for each of the settings"""
+        table = np.array(self.ops, dtype=np.float64)
+        codes = np.broadcast_to(table[:, 0].astype(np.int8), (len(settings), len(table)))
+        args = np.repeat(table[None, :, 1:], len(settings), axis=0)
+        speeds = {name: np.array([setting[name] for setting in settings], dtype=np.float64)
+                  for name in SPEED_SETTINGS.values()}
+        for op, setting in self.speed_ops:
+            args[:, op, 0] = speeds[setting]
+        for op, distance, setting, turning in self.travel_ops:
+            duration = distance / expected_velocity(speeds[setting], turning)
+            if self.ops[op][0] == ARRIVE:
+                args[:, op, 6] = 2 * duration + 1
+            else:
+                args[:, op, 0] = duration
+        return codes, args
+
+
+def compile_lap(settings: Dict[str, object]) -> LapProgram:
+    """Segment loop of run_race for one lap, following execute_segment
+
+    Turns in place, timed and closed-loop segments, cornering-arc chords and
+    continuous motion are modelled; speed profiles, pure pursuit and the
+    learned corrections are not.
+    """
+    continuous = settings['CONTINUOUS_MOTION']
+    waypoints = settings['waypoints']
+
+    def is_arc_chord(a: Waypoint, b: Waypoint) -> bool:
+        distance = math.hypot(b[0] - a[0], b[1] - a[1])
+        return distance >= 1 and segment_class(a[2], b[2], distance, settings['PANEL_SIZE']) == APPROACH
+
+    # Cornering-arc chords are swept without the heading wait and the pause around them
+    chords = [is_arc_chord(a, b) for a, b in zip(waypoints[:-1], waypoints[1:])] + [False]
+    program = LapProgram()
+    for i, ((start_x, start_y, start_heading), (end_x, end_y, end_heading)) in enumerate(
+            zip(waypoints[:-1], waypoints[1:])):
+        heading = int(round(normalize_heading(end_heading))) % 360
+        distance = math.hypot(end_x - start_x, end_y - start_y)
+        if distance < 1:
+            program.add(HEADING, heading)
+            if not continuous:
+                program.add(WAIT, TURN_WAIT)
+        else:
+            # Which of the speed settings drives the segment, by the racer's own rule
+            kind = segment_class(start_heading, end_heading, distance, settings['PANEL_SIZE'])
+            setting, turning = SPEED_SETTINGS[kind], kind == TURN
+            program.add(HEADING, heading)
+            if not continuous and not chords[i]:
+                program.add(WAIT, HEADING_WAIT)
+            program.speed_ops.append((program.add(SPEED), setting))
+            if settings['CLOSED_LOOP']:
+                rad = math.radians(end_heading)
+                op = program.add(ARRIVE, end_x, end_y, math.cos(rad), -math.sin(rad),
+                                 settings['ARRIVAL_TOLERANCE'], settings['POLL_INTERVAL'])
+            else:
+                op = program.add(WAIT)
+            program.travel_ops.append((op, distance, setting, turning))
+        if not continuous and not (chords[i] or chords[i + 1]):
+            program.add(WAIT, SEGMENT_PAUSE)
+    program.add(END)
+    return program
+
+
+def compile_batch(settings: Sequence[Dict[str, object]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Operation codes (N, K) and arguments (N, K, ARGS), padded with END
+
+    Configurations that only differ in their speeds share one compiled lap.
+    """
+    groups: Dict[tuple, List[int]] = {}
+    for i, setting in enumerate(settings):
+        key = (id(setting['waypoints']), setting['PANEL_SIZE'], setting['CLOSED_LOOP'],
+               setting['CONTINUOUS_MOTION'], setting['ARRIVAL_TOLERANCE'], setting['POLL_INTERVAL'])
+        groups.setdefault(key, []).append(i)
+    filled = []
+    for members in groups.values():
+        program = compile_lap(settings[members[0]])
+        filled.append((members, program.fill([settings[i] for i in members])))
+    length = max(codes.shape[1] for _, (codes, _) in filled)
+    codes = np.full((len(settings), length), END, dtype=np.int8)
+    args = np.zeros((len(settings), length, ARGS))
+    for members, (group_codes, group_args) in filled:
+        codes[members, :group_codes.shape[1]] = group_codes
+        args[members, :group_args.shape[1]] = group_args
+    return codes, args
+
+
+@functools.lru_cache(maxsize=8)
+def corridor_map(path: Tuple[Point, ...], resolution: float = 1.0,
+                 margin: float = 100.0) -> Tuple[float, float, float, np.ndarray]:
+    """Distance to the centre line sampled on a grid around it: (x0, y0, resolution, grid)"""
+    points = np.asarray(path, dtype=np.float64)
+    x0, y0 = points.min(axis=0) - margin
+    x1, y1 = points.max(axis=0) + margin
+    xs = np.arange(x0, x1 + resolution, resolution)
+    ys = np.arange(y0, y1 + resolution, resolution)
+    grid = np.empty((len(ys), len(xs)), dtype=np.float32)
+    for row in range(0, len(ys), 64):  # Chunks keep the (points, segments) temporaries small
+        gx, gy = np.meshgrid(xs, ys[row:row + 64])
+        grid[row:row + 64] = cross_track_error(gx.ravel(), gy.ravel(), list(path)).reshape(gx.shape)
+    return x0, y0, resolution, grid
+
+
+def corridor_error(x: np.ndarray, y: np.ndarray, path: Tuple[Point, ...]) -> np.ndarray:
+    """Distance of every robot to the centre line, looked up on the map
+
+    Beyond the map edge it is the edge value plus the distance to the edge,
+    an upper bound; such a robot is far outside the corridor either way.
+    """
+    x0, y0, resolution, grid = corridor_map(path)
+    rows, cols = grid.shape
+    map_x = np.clip(x, x0, x0 + (cols - 1) * resolution)
+    map_y = np.clip(y, y0, y0 + (rows - 1) * resolution)
+    col = np.rint((map_x - x0) / resolution).astype(np.intp)
+    row = np.rint((map_y - y0) / resolution).astype(np.intp)
+    return grid[row, col] + np.hypot(x - map_x, y - map_y)
+
+
+def simulate_batch(configs: Sequence[Dict[str, object]], reference: Optional[List[Waypoint]] = None,
+                   dt: float = 0.02, max_time: float = 120.0,
+                   max_accel: float = 150.0, max_decel: float = 250.0, max_turn_rate: float = 360.0,
+                   command_latency: float = 0.03, cms_per_speed: float = 0.8) -> Dict[str, np.ndarray]:
+    """Race one lap per configuration, all robots stepped together
+
+    Every configuration is a dict of racer settings (DEFAULT_SETTINGS fills
+    the rest). At the default 20ms step lap times stay within about 0.05s of
+    a 5ms step. A robot is out of bounds while its centre is more than half
+    a panel from the centre line of `reference` (the course by default).
+    Returns per configuration: lap time (NaN if unfinished after
+    `max_time`), boundary violations (times it left the corridor), the
+    largest distance from the centre line and how far from the finish
+    waypoint it stopped.
+    """
+    settings = [dict(DEFAULT_SETTINGS, **config) for config in configs]
+    codes, args = compile_batch(settings)
+    n = len(settings)
+    rows = np.arange(n)
+
+    start = np.array([setting['waypoints'][0] for setting in settings], dtype=np.float64)
+    finish = np.array([setting['waypoints'][-1][:2] for setting in settings], dtype=np.float64)
+    path = tuple(centre_line(reference or COURSE_WAYPOINTS))
+    half_width = np.array([setting['PANEL_SIZE'] / 2 for setting in settings], dtype=np.float64)
+
+    # Physical state (course frame: heading clockwise from +x)
+    x, y, yaw = start[:, 0].copy(), start[:, 1].copy(), start[:, 2] % 360
+    cos, sin = np.cos(np.radians(yaw)), np.sin(np.radians(yaw))
+    velocity = np.zeros(n)
+    target_yaw, target_velocity = yaw.copy(), np.zeros(n)
+    pending_t = np.full(n, np.inf)
+    pending_yaw, pending_velocity = np.zeros(n), np.zeros(n)
+    max_yaw_step = max_turn_rate * dt
+
+    # Racer state: commanded heading/speed, program counter, race timeline
+    heading, speed = yaw.copy(), np.zeros(n)
+    pc = np.zeros(n, dtype=np.intp)
+    wake = np.zeros(n)           # Next time the racer's program needs to run
+    deadline = np.zeros(n)       # Scheduler timeline
+    entered = np.zeros(n, dtype=bool)
+    arrive_by = np.zeros(n)
+    done = np.zeros(n, dtype=bool)
+    lap_time = np.full(n, np.nan)
+    stop_x, stop_y = np.zeros(n), np.zeros(n)
+
+    violations = np.zeros(n, dtype=np.int64)
+    max_error = np.zeros(n)
+    outside = np.zeros(n, dtype=bool)
+
+    def send(i: np.ndarray, t: float):
+        """Heading and speed go out as one drive packet; the call blocks for the latency"""
+        pending_t[i] = t + command_latency
+        pending_yaw[i] = heading[i]
+        pending_velocity[i] = speed[i] * cms_per_speed
+        wake[i] = t + command_latency
+
+    steps = int(math.ceil(max_time / dt))
+    for step in range(steps + 1):
+        t = step * dt
+
+        # Commands whose latency has elapsed reach the motors
+        due = np.flatnonzero(pending_t <= t)
+        if due.size:
+            target_yaw[due] = pending_yaw[due]
+            target_velocity[due] = pending_velocity[due]
+            pending_t[due] = np.inf
+
+        # Racers whose call returned or whose wait is over run their program until they wait
+        active = np.flatnonzero(wake <= t)
+        while active.size:
+            code = codes[active, pc[active]]
+            arg = args[active, pc[active]]
+            advanced = np.zeros(active.size, dtype=bool)
+
+            send_op = (code == HEADING) | (code == SPEED)
+            if send_op.any():
+                i = active[send_op]
+                heading_op = code[send_op] == HEADING
+                heading[i[heading_op]] = arg[send_op][heading_op, 0]
+                speed[i[~heading_op]] = arg[send_op][~heading_op, 0]
+                send(i, t)
+                pc[i] += 1
+
+            wait_op = np.flatnonzero(code == WAIT)
+            if wait_op.size:
+                i = active[wait_op]
+                duration = arg[wait_op, 0]
+                new = ~entered[i]
+                # Deadline timeline: a loop that overran a whole interval drops it
+                deadline[i[new]] += duration[new]
+                late = new & (t - deadline[i] > duration)
+                deadline[i[late]] = t
+                woke = t >= deadline[i] - 1e-9
+                entered[i] = ~woke
+                pc[i[woke]] += 1
+                wake[i[~woke]] = deadline[i[~woke]]
+                advanced[wait_op[woke]] = True
+
+            arrive_op = np.flatnonzero(code == ARRIVE)
+            if arrive_op.size:
+                i = active[arrive_op]
+                a = arg[arrive_op]
+                new = ~entered[i]
+                arrive_by[i[new]] = t + a[new, 6]
+                remaining = (a[:, 0] - x[i]) * a[:, 2] + (a[:, 1] - y[i]) * a[:, 3]
+                arrived = (remaining <= a[:, 4]) | (t >= arrive_by[i])
+                entered[i] = ~arrived
+                deadline[i[arrived]] = np.maximum(deadline[i[arrived]], t)
+                pc[i[arrived]] += 1
+                wake[i[~arrived]] = t + a[~arrived, 5] - 1e-9  # Next locator poll
+                advanced[arrive_op[arrived]] = True
+
+            end_op = code == END
+            if end_op.any():
+                i = active[end_op]
+                speed[i] = 0
+                send(i, t)
+                lap_time[i] = t + command_latency
+                stop_x[i], stop_y[i] = x[i], y[i]
+                done[i] = True
+                wake[i] = np.inf
+
+            active = active[advanced]
+
+        if done.all():
+            break
+
+        # Rate-limited turn and acceleration-limited speed, as in sphero_sim;
+        # the trigonometry is only redone for the robots that are turning
+        turning = np.flatnonzero(np.abs(target_yaw - yaw) > 1e-9)
+        if turning.size:
+            yaw_error = (target_yaw[turning] - yaw[turning] + 180) % 360 - 180
+            yaw[turning] = (yaw[turning] + np.minimum(np.maximum(yaw_error, -max_yaw_step), max_yaw_step)) % 360
+            rad = np.radians(yaw[turning])
+            cos[turning], sin[turning] = np.cos(rad), np.sin(rad)
+        velocity += np.minimum(np.maximum(target_velocity - velocity, -max_decel * dt), max_accel * dt)
+        travel = velocity * dt
+        x += travel * cos
+        y -= travel * sin
+
+        # Corridor check for the robots still racing
+        racing = np.flatnonzero(~done)
+        error = corridor_error(x[racing], y[racing], path)
+        out = error > half_width[racing]
+        violations[racing] += out & ~outside[racing]
+        outside[racing] = out
+        max_error[racing] = np.maximum(max_error[racing], error)
+
+    unfinished = ~done
+    stop_x[unfinished], stop_y[unfinished] = x[unfinished], y[unfinished]
+    return {
+        'lap_time': lap_time,
+        'violations': violations,
+        'max_error': max_error,
+        'finish_error': np.hypot(stop_x - finish[rows, 0], stop_y - finish[rows, 1]),
+    }
+
+
+def random_configs(n: int, ranges: Dict[str, Tuple[float, float]],
+                   fixed: Optional[Dict[str, object]] = None, seed: int = 0) -> List[Dict[str, object]]:
+    """`n` configurations with integer settings drawn uniformly from `ranges`"""
+    rng = random.Random(seed)
+    return [dict(fixed or {}, **{name: rng.randint(int(low), int(high)) for name, (low, high) in ranges.items()})
+            for _ in range(n)]
+
+
+def main(n: int, overrides: Dict[str, object]):
+    # NAME=low:high is searched, NAME=value is fixed
+    ranges = {'STRAIGHT_SPEED': (60, 200), 'TURN_SPEED': (30, 120), 'APPROACH_SPEED': (40, 160)}
+    fixed = {}
+    for name, value in overrides.items():
+        if isinstance(value, str) and ":" in value:
+            low, high = value.split(":")
+            ranges[name] = (float(low), float(high))
+        else:
+            fixed[name] = value
+    configs = random_configs(n, ranges, fixed)
+
+    start = time.perf_counter()
+    results = simulate_batch(configs)
+    elapsed = time.perf_counter() - start
+    print(f"🏎️ {n} laps simulated in {elapsed:.2f}s ({n / elapsed:,.0f} laps/s)")
+
+    clean = np.flatnonzero((results['violations'] == 0) & ~np.isnan(results['lap_time']))
+    print(f"✅ {clean.size} configurations stayed inside the corridor")
+    for i in clean[np.argsort(results['lap_time'][clean])][:5]:
+        searched = ", ".join(f"{name}={configs[i][name]}" for name in ranges)
+        print(f"   {results['lap_time'][i]:6.2f}s  {searched}  "
+              f"(max {results['max_error'][i]:.0f}cm off, stopped {results['finish_error'][i]:.0f}cm from finish)")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    # Racer settings as NAME=value or NAME=low:high, e.g. CLOSED_LOOP=True STRAIGHT_SPEED=80:220
+    settings = {}
+    for arg in sys.argv[2:]:
+        name, _, value = arg.partition("=")
+        try:
+            settings[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            settings[name] = value
+    main(count, settings)
@@ -0,0 +1,99 @@
+"""
+Redundant-command elimination
+Tracks what the robot was last told and drops commands that would not
+change anything; a heading and speed change together go out as one packet
+"""
+
+from typing import Optional
+
+
+class StatefulAPI:
+    """SpheroEduAPI wrapper that suppresses commands repeating the current state
+
+    Sits directly on the API object, so it sees exactly what reaches the
+    link. Anything it does not track is passed through unchanged.
+    """
+
+    def __init__(self, api):
+        self._api = api
+        self.heading: Optional[int] = None
+        self.speed: Optional[int] = None
+        self.led = None
+        self.sent = 0        # Packets that went out
+        self.suppressed = 0  # Commands dropped as redundant
+        self.merged = 0      # Heading+speed pairs sent as one packet
+
+    def __getattr__(self, name):
+        return getattr(self._api, name)
+
+    def set_heading(self, heading: int):
+        heading = int(heading) % 360
+        if heading == self.heading:
+            self.suppressed += 1
+            return
+        self._api.set_heading(heading)
+        self.heading = heading
+        self.sent += 1
+
+    def set_speed(self, speed: int):
+        speed = int(speed)
+        if speed == self.speed:
+            self.suppressed += 1
+            return
+        self._api.set_speed(speed)
+        self.speed = speed
+        self.sent += 1
+
+    def drive(self, heading: int, speed: int):
+        """Set heading and speed, sending at most one packet"""
+        heading, speed = int(heading) % 360, int(speed)
+        if heading != self.heading and speed != self.speed:
+            self._roll_start(heading, speed)
+        elif heading != self.heading:
+            self.set_heading(heading)
+            self.suppressed += 1
+        else:
+            self.set_speed(speed)
+            self.suppressed += 1
+
+    def _roll_start(self, heading: int, speed: int):
+        # SpheroEduAPI sends its stored heading with every speed change, so staging
+        # the heading first turns the pair into a single drive packet
+        staged = "_SpheroEduAPI__heading"
+        if hasattr(self._api, staged):
+            setattr(self._api, staged, heading)
+            self._api.set_speed(speed)
+            self.merged += 1
+            self.sent += 1
+        else:
+            self._api.set_heading(heading)
+            self._api.set_speed(speed)
+            self.sent += 2
+        self.heading, self.speed = heading, speed
+
+    def roll(self, heading: int, speed: int, duration: float):
+        self._api.roll(heading, speed, duration)
+        self.heading, self.speed = int(heading) % 360, 0
+        self.sent += 2
+
+    def stop_roll(self, heading: Optional[int] = None):
+        if heading is None:
+            self._api.stop_roll()
+        else:
+            self._api.stop_roll(heading)
+            self.heading = int(heading) % 360
+        self.speed = 0
+        self.sent += 1
+
+    def reset_aim(self):
+        self._api.reset_aim()
+        self.heading = None  # Heading is relative to the new aim
+        self.sent += 1
+
+    def set_main_led(self, color):
+        if self.led is not None and color == self.led:
+            self.suppressed += 1
+            return
+        self._api.set_main_led(color)
+        self.led = color
+        self.sent += 1
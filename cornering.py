@@ -0,0 +1,71 @@
+"""
+Cornering arcs
+Replaces the turn-in-place waypoint pairs at every corner with a swept arc
+that stays inside the corner panel, driven as a chain of short chords
+"""
+
+import math
+from typing import List, Tuple
+
+from course import Waypoint, direction
+from headings import shortest_turn
+
+
+def arc_points(corner: Tuple[float, float], heading_in: float, heading_out: float,
+               radius: float, step: float = 15.0) -> List[Waypoint]:
+    """Waypoints of the arc that rounds `corner`, tangent to both headings
+
+    The first point is where the arc leaves the incoming straight (keeping
+    `heading_in`), every following point carries the heading of the chord
+    that leads to it.
+    """
+    turn = shortest_turn(heading_in, heading_out)
+    half = math.radians(abs(turn)) / 2
+    tangent = radius * math.tan(half)  # Distance from the corner to where the arc starts
+
+    in_x, in_y = direction(heading_in)
+    x, y = corner[0] - in_x * tangent, corner[1] - in_y * tangent
+    points = [(x, y, heading_in)]
+
+    chords = max(1, int(math.ceil(abs(turn) / step)))
+    sweep = turn / chords
+    chord = 2 * radius * math.sin(math.radians(abs(sweep)) / 2)
+    for k in range(chords):
+        heading = heading_in + sweep * (k + 0.5)
+        dx, dy = direction(heading)
+        x, y = x + dx * chord, y + dy * chord
+        points.append((x, y, round(heading) % 360))
+    return points
+
+
+def build_cornering_path(waypoints: List[Waypoint], radius: float = 25.0,
+                         step: float = 15.0) -> List[Waypoint]:
+    """Replace every turn-in-place pair with a cornering arc
+
+    `radius` is capped per corner so the arc never starts before the middle
+    of either neighbouring straight. Corners of 180° or more are kept as
+    turns in place.
+    """
+    path: List[Waypoint] = [waypoints[0]]
+    i = 1
+    while i < len(waypoints):
+        x, y, heading_out = waypoints[i]
+        px, py, heading_in = path[-1]
+        same_spot = math.hypot(x - px, y - py) < 1
+        turn = abs(shortest_turn(heading_in, heading_out))
+
+        if not same_spot or turn < 1 or turn >= 179 or len(path) < 2 or i + 1 >= len(waypoints):
+            path.append(waypoints[i])
+            i += 1
+            continue
+
+        # Room on both straights around the corner
+        before = math.hypot(px - path[-2][0], py - path[-2][1])
+        after = math.hypot(waypoints[i + 1][0] - x, waypoints[i + 1][1] - y)
+        half = math.radians(turn) / 2
+        fitted = min(radius, min(before, after) / 2 / math.tan(half))
+
+        path.pop()  # The corner itself is replaced by the arc
+        path.extend(arc_points((x, y), heading_in, heading_out, fitted, step))
+        i += 1
+    return path
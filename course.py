@@ -0,0 +1,88 @@
+"""
+Course geometry helpers
+Shared by the cornering, racing-line and tracking code
+Course frame: cm, heading 0° = +x, headings increase clockwise (towards -y)
+"""
+
+import math
+from typing import List, Tuple
+
+from headings import is_turn
+
+Waypoint = Tuple[float, float, float]
+Point = Tuple[float, float]
+
+# Course waypoints (clockwise from start/finish line)
+# Coordinates in cm, heading in degrees
+# Aangepast voor het werkelijke parcours layout
+COURSE_WAYPOINTS: List[Waypoint] = [
+    (200, 250, 0),
+    (450, 250, 0),
+    (450, 250, 90),
+    (450, 50, 90),
+    (450, 50, 180),
+    (350, 50, 180),
+    (350, 50, 270),
+    (350, 150, 270),
+    (350, 150, 180),
+    (150, 150, 180),
+    (150, 150, 90),
+    (150, 50, 90),
+    (150, 50, 180),
+    (50, 50, 180),
+    (50, 50, 270),
+    (50, 250, 270),
+    (50, 250, 0),
+    (250, 250, 0),
+]
+
+
+def direction(heading: float) -> Point:
+    """Unit vector of a course heading"""
+    rad = math.radians(heading)
+    return math.cos(rad), -math.sin(rad)
+
+
+def heading_between(start: Point, end: Point) -> float:
+    """Course heading (0-360) of the straight line from `start` to `end`"""
+    return math.degrees(math.atan2(-(end[1] - start[1]), end[0] - start[0])) % 360
+
+
+def centre_line(waypoints: List[Waypoint]) -> List[Point]:
+    """Polyline through the waypoints without the turn-in-place duplicates"""
+    points = [(waypoints[0][0], waypoints[0][1])]
+    for x, y, _ in waypoints[1:]:
+        if math.hypot(x - points[-1][0], y - points[-1][1]) >= 1:
+            points.append((x, y))
+    return points
+
+
+def corners(waypoints: List[Waypoint]) -> List[Point]:
+    """Centre-line vertices where the course turns"""
+    path = centre_line(waypoints)
+    return [b for a, b, c in zip(path[:-2], path[1:-1], path[2:])
+            if is_turn(heading_between(a, b), heading_between(b, c))]
+
+
+def path_length(points: List[Point]) -> float:
+    """Total length of a polyline in cm"""
+    return sum(math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in zip(points[:-1], points[1:]))
+
+
+def chain_laps(waypoints: List[Waypoint], laps: int) -> List[Waypoint]:
+    """Waypoints for `laps` laps back to back, each later lap starting on the previous finish
+
+    Where the finish straight runs on into the first segment of the next lap
+    the finish waypoint is dropped, so the robot drives through the line.
+    """
+    path = list(waypoints)
+    for _ in range(laps - 1):
+        before, finish, after = path[-2], path[-1], waypoints[1]
+        heading = heading_between(before[:2], finish[:2])
+        straight_on = (before[2] == finish[2] == after[2]
+                       and abs(heading - heading_between(finish[:2], after[:2])) < 1e-6
+                       and abs(heading - finish[2] % 360) < 1e-6)
+        if straight_on:
+            path.pop()
+        path.extend(waypoints[1:])
+    return path
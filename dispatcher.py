@@ -0,0 +1,164 @@
+"""
+Priority command dispatcher
+Owns the BLE link: one worker thread sends queued commands motion first,
+then LED and cosmetic commands, then telemetry requests
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+MOTION, LED, TELEMETRY = 0, 1, 2
+
+MOTION_COMMANDS = {"set_heading", "set_speed", "drive", "roll", "stop_roll", "reset_aim", "spin"}
+
+
+def command_priority(name: str) -> int:
+    """Queue priority of an API method (lower is sent first)"""
+    if name in MOTION_COMMANDS:
+        return MOTION
+    if name.startswith("get_"):
+        return TELEMETRY
+    return LED
+
+
+class CommandDispatcher:
+    """Priority queue in front of an API object, drained by one worker thread
+
+    Commands of equal priority keep their order. A queued LED command is
+    replaced by a newer call of the same command (only the last colour
+    matters). While the link is busy with motion commands, a telemetry
+    request is dropped in favour of the last answer if that is recent enough.
+    """
+
+    def __init__(self, api, busy_threshold: int = 1, max_age: float = 0.05):
+        self.api = api
+        self.busy_threshold = busy_threshold  # Queued motion commands that make the link busy
+        self.max_age = max_age                # s a cached telemetry answer stays usable
+        self.coalesced = 0
+        self.dropped = 0
+        self._queue: List[Tuple[int, int, str, tuple, dict, Future]] = []
+        self._pending_led: Dict[str, list] = {}  # Command name -> its queue entry
+        self._cache: Dict[Tuple[str, tuple], Tuple[float, object]] = {}  # -> (time, result)
+        self._order = itertools.count()
+        self._motion_queued = 0
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._idle = True
+        self._condition = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name="sphero-dispatch", daemon=True)
+        self._worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def submit(self, name: str, *args, **kwargs) -> Future:
+        """Queue `api.name(*args, **kwargs)` and return a Future for its result"""
+        priority = command_priority(name)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Command dispatcher is closed")
+            if priority == LED and name in self._pending_led:
+                entry = self._pending_led[name]
+                entry[3], entry[4] = args, kwargs
+                self.coalesced += 1
+                return entry[5]
+            entry = [priority, next(self._order), name, args, kwargs, Future()]
+            heapq.heappush(self._queue, entry)
+            if priority == LED:
+                self._pending_led[name] = entry
+            elif priority == MOTION:
+                self._motion_queued += 1
+            self._condition.notify()
+            return entry[5]
+
+    def busy(self) -> bool:
+        return self._motion_queued >= self.busy_threshold
+
+    def cached(self, name: str, args: tuple):
+        """Last result of a telemetry request, or None when missing or too old"""
+        entry = self._cache.get((name, args))
+        if entry is None or time.monotonic() - entry[0] > self.max_age:
+            return None
+        return entry[1]
+
+    def raise_error(self):
+        """Re-raise an error from a fire-and-forget command in the caller's thread"""
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued command was sent"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queue and self._idle, timeout)
+
+    def close(self):
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                priority, _, name, args, kwargs, future = heapq.heappop(self._queue)
+                if priority == LED:
+                    self._pending_led.pop(name, None)
+                elif priority == MOTION:
+                    self._motion_queued -= 1
+                self._idle = False
+
+            try:
+                result = getattr(self.api, name)(*args, **kwargs)
+                if priority == TELEMETRY:
+                    self._cache[(name, args)] = (time.monotonic(), result)
+                future.set_result(result)
+            except Exception as e:
+                self._error = e
+                future.set_exception(e)
+
+            with self._condition:
+                self._idle = True
+                self._condition.notify_all()
+
+
+class DispatchedAPI:
+    """SpheroEduAPI stand-in that routes every call through a CommandDispatcher
+
+    Motion and LED commands return immediately; telemetry blocks for its
+    answer unless the link is busy and a previous answer can be reused.
+    """
+
+    def __init__(self, dispatcher: CommandDispatcher):
+        self._dispatcher = dispatcher
+
+    def __getattr__(self, name):
+        attribute = getattr(self._dispatcher.api, name)
+        if not callable(attribute):
+            return attribute
+        dispatcher = self._dispatcher
+
+        def dispatched(*args, **kwargs):
+            dispatcher.raise_error()
+            if command_priority(name) != TELEMETRY:
+                dispatcher.submit(name, *args, **kwargs)
+                return None
+            if dispatcher.busy() and not kwargs:
+                cached = dispatcher.cached(name, args)
+                if cached is not None:
+                    dispatcher.dropped += 1
+                    return cached
+            return dispatcher.submit(name, *args, **kwargs).result()
+        return dispatched
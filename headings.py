@@ -0,0 +1,36 @@
+"""
+Heading arithmetic
+Wrap-around safe heading math and turn classification
+Headings are degrees, clockwise positive, like the Sphero API
+"""
+
+TURN_THRESHOLD = 45  # Heading changes above this many degrees count as a turn
+
+
+def normalize_heading(heading: float) -> float:
+    """Heading in the range [0, 360)"""
+    return heading % 360
+
+
+def shortest_turn(start_heading: float, end_heading: float) -> float:
+    """Signed shortest rotation from start to end heading in (-180, 180]
+
+    Positive turns are clockwise, so 270 -> 0 is +90 and 0 -> 270 is -90.
+    """
+    turn = (end_heading - start_heading) % 360
+    return turn - 360 if turn > 180 else turn
+
+
+def turn_direction(start_heading: float, end_heading: float) -> str:
+    """'clockwise', 'counter-clockwise' or 'none' for the shortest rotation"""
+    turn = shortest_turn(start_heading, end_heading)
+    if turn > 0:
+        return "clockwise"
+    if turn < 0:
+        return "counter-clockwise"
+    return "none"
+
+
+def is_turn(start_heading: float, end_heading: float, threshold: float = TURN_THRESHOLD) -> bool:
+    """True when the heading change is large enough to drive at turn speed"""
+    return abs(shortest_turn(start_heading, end_heading)) > threshold
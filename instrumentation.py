@@ -0,0 +1,234 @@
+"""
+Race instrumentation
+Splits a lap into time spent moving, turning in place, sleeping,
+waiting on BLE commands and printing, per segment and in total,
+and profiles the latency of every SpheroEduAPI call
+"""
+
+import bisect
+import json
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+PHASES = ("sleeping", "command", "printing")
+
+# Upper bucket edges (ms) of the command latency histograms
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500, 1000)
+
+
+class RaceTimer:
+    """Accumulates wall time per phase and per segment of a race"""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.race_start = self.clock()
+        self.race_end: Optional[float] = None
+        self.totals: Dict[str, float] = {phase: 0.0 for phase in PHASES}
+        self.segments: List[Dict[str, object]] = []
+        self._segment: Optional[Dict[str, object]] = None
+        self._depth = 0
+
+    def start_race(self):
+        self.reset()
+
+    def end_race(self):
+        self.race_end = self.clock()
+
+    def start_segment(self, index: int, kind: str):
+        """Open a segment record; kind is 'moving' or 'turning'"""
+        self.end_segment()
+        self._segment = {'index': index, 'kind': kind, 'start': self.clock() - self.race_start}
+        self._segment.update({phase: 0.0 for phase in PHASES})
+
+    def end_segment(self):
+        segment = self._segment
+        if segment is None:
+            return
+        segment['duration'] = self.clock() - self.race_start - segment['start']
+        segment['other'] = segment['duration'] - sum(segment[phase] for phase in PHASES)
+        self.segments.append(segment)
+        self._segment = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """Charge the time spent inside the block to `name` (outermost phase wins)"""
+        if self._depth:
+            yield
+            return
+        self._depth += 1
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.add(name, self.clock() - start)
+
+    def add(self, name: str, seconds: float):
+        if self.race_end is not None:
+            return  # Race is over, e.g. the victory LED
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        if self._segment is not None:
+            self._segment[name] = self._segment.get(name, 0.0) + seconds
+
+    def report(self) -> Dict[str, object]:
+        """Machine-readable breakdown of the race
+
+        Two independent splits of the same total, each adding up to it:
+        'by_kind' (moving, turning, between segments) and 'by_phase'
+        (sleeping, command, printing, other).
+        """
+        end = self.race_end if self.race_end is not None else self.clock()
+        total = end - self.race_start
+        by_kind = {'moving': 0.0, 'turning': 0.0}
+        for segment in self.segments:
+            by_kind[segment['kind']] = by_kind.get(segment['kind'], 0.0) + segment['duration']
+        by_kind['between_segments'] = total - sum(by_kind.values())
+        by_phase = dict(self.totals)
+        by_phase['other'] = total - sum(self.totals.values())
+        return {'total': total, 'by_kind': by_kind, 'by_phase': by_phase, 'segments': self.segments}
+
+    def write_report(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+class TimedAPI:
+    """Transparent SpheroEduAPI wrapper that charges every call to the 'command' phase"""
+
+    def __init__(self, api, timer: RaceTimer):
+        self._api = api
+        self._timer = timer
+
+    def __getattr__(self, name):
+        attribute = getattr(self._api, name)
+        if not callable(attribute):
+            return attribute
+
+        def timed(*args, **kwargs):
+            with self._timer.phase("command"):
+                return attribute(*args, **kwargs)
+        return timed
+
+
+class CommandProfiler:
+    """Per-command latency samples, histograms and percentiles"""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.reset()
+
+        self.listeners: List[Callable[[str, float], None]] = []  # Called with every sample
+
+    def reset(self):
+        self.origin = self.clock()
+        self.samples: Dict[str, List[float]] = {}  # Command name -> latencies (s)
+        self.calls: List[Tuple[float, str, float]] = []  # (start since reset, name, latency)
+
+    def record(self, name: str, start: float, latency: float):
+        self.samples.setdefault(name, []).append(latency)
+        self.calls.append((start - self.origin, name, latency))
+        for listener in self.listeners:
+            listener(name, latency)
+
+    def percentile(self, name: str, p: float) -> float:
+        """Latency (s) below which `p` percent of the calls to `name` finished"""
+        ordered = sorted(self.samples.get(name, ()))
+        if not ordered:
+            return 0.0
+        rank = max(0, int(math.ceil(p / 100 * len(ordered))) - 1)
+        return ordered[rank]
+
+    def histogram(self, name: str) -> List[int]:
+        """Call counts per LATENCY_BUCKETS bucket, plus one overflow bucket"""
+        counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        for latency in self.samples.get(name, ()):
+            counts[bisect.bisect_left(LATENCY_BUCKETS, latency * 1000)] += 1
+        return counts
+
+    def summary(self) -> Dict[str, Dict[str, object]]:
+        result = {}
+        for name, latencies in sorted(self.samples.items()):
+            result[name] = {
+                'count': len(latencies),
+                'total': sum(latencies),
+                'mean': sum(latencies) / len(latencies),
+                'p50': self.percentile(name, 50),
+                'p95': self.percentile(name, 95),
+                'p99': self.percentile(name, 99),
+                'max': max(latencies),
+                'histogram': self.histogram(name),
+            }
+        return result
+
+    def print_summary(self):
+        print("📡 Command latency (ms):")
+        print(f"   {'command':<18} {'calls':>5} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7}")
+        for name, stats in self.summary().items():
+            print(f"   {name:<18} {stats['count']:>5} {stats['p50'] * 1000:7.1f} "
+                  f"{stats['p95'] * 1000:7.1f} {stats['p99'] * 1000:7.1f} {stats['max'] * 1000:7.1f}")
+
+    def write_report(self, path: str):
+        report = {
+            'buckets_ms': list(LATENCY_BUCKETS),
+            'commands': self.summary(),
+            'calls': [{'t': t, 'command': name, 'latency': latency} for t, name, latency in self.calls],
+        }
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+class LatencyEstimator:
+    """Online per-command latency estimate (exponentially weighted moving average)"""
+
+    def __init__(self, smoothing: float = 0.2, default: float = 0.0):
+        self.smoothing = smoothing  # Weight of the newest sample
+        self.default = default      # Estimate before any command was measured
+        self.estimates: Dict[str, float] = {}
+
+    def observe(self, name: str, latency: float):
+        previous = self.estimates.get(name)
+        if previous is None:
+            self.estimates[name] = latency
+        else:
+            self.estimates[name] = previous + self.smoothing * (latency - previous)
+
+    def estimate(self, name: str) -> float:
+        """Expected latency (s) of `name`, or the average of all commands if never seen"""
+        if name in self.estimates:
+            return self.estimates[name]
+        if self.estimates:
+            return sum(self.estimates.values()) / len(self.estimates)
+        return self.default
+
+
+class ProfiledAPI:
+    """Transparent SpheroEduAPI wrapper that timestamps every call into a CommandProfiler
+
+    Attribute writes go through to the API, so a wrapper above it can still
+    stage state on the API object (the heading SpheroEduAPI sends with a speed).
+    """
+
+    def __init__(self, api, profiler: CommandProfiler):
+        object.__setattr__(self, "_api", api)
+        object.__setattr__(self, "_profiler", profiler)
+
+    def __setattr__(self, name, value):
+        setattr(self._api, name, value)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._api, name)
+        if not callable(attribute):
+            return attribute
+
+        def profiled(*args, **kwargs):
+            start = self._profiler.clock()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                self._profiler.record(name, start, self._profiler.clock() - start)
+        return profiled
@@ -0,0 +1,28 @@
+"""
+Keyed JSON store
+Calibration and learning files keep one entry per key (a surface, a course
+and mode); saving an entry replaces it and keeps the others in the file
+"""
+
+import json
+import os
+from typing import Dict, Optional
+
+
+def load_entry(path: str, key: str) -> Optional[Dict]:
+    """Entry stored under `key`, or None if the file or the key is missing"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get(key)
+
+
+def save_entry(path: str, key: str, entry: Dict):
+    """Store `entry` under `key`, keeping the other entries in the file"""
+    entries = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            entries = json.load(f)
+    entries[key] = entry
+    with open(path, "w") as f:
+        json.dump(entries, f, indent=2)
@@ -0,0 +1,89 @@
+"""
+Landmark drift reset
+The course walls are known lines; when the robot bumps into one its centre
+is a robot radius inside it, so the position estimate across that wall is
+snapped back and odometry error cannot pile up lap after lap
+"""
+
+import math
+from typing import List, Optional, Tuple
+
+from course import Point, Waypoint, centre_line, direction
+
+Correction = Tuple[Optional[float], Optional[float]]  # (dx, dy), None on an axis the wall says nothing about
+
+
+class LandmarkAnchor:
+    """Matches collisions to the wall that was hit and records the corrections
+
+    The walls are the edges of the panel corridor: `half_width` cm either
+    side of the centre line, and as far past each end of a straight. A
+    wall only fixes the position across it; on this rectilinear course that
+    is one axis, the other keeps its estimate.
+    """
+
+    def __init__(self, waypoints: List[Waypoint], half_width: float = 25.0,
+                 robot_radius: float = 3.65, radius: float = 15.0):
+        self.path: List[Point] = centre_line(waypoints)
+        self.half_width = half_width
+        self.robot_radius = robot_radius  # cm from the robot's centre to its shell
+        self.radius = radius  # cm an estimate may be off across a wall and still match it
+        self.corrections: List[Tuple[int, str, float, float]] = []  # (segment, event, dx, dy)
+
+    def match(self, x: float, y: float, heading: Optional[float] = None) -> Optional[Tuple[int, int]]:
+        """(segment, side) of the wall the robot at (x, y) touches, or None
+
+        The side is signed like the cross-track error: +1 right of travel.
+        With the robot's `heading` the walls it was driving away from cannot
+        match, so an estimate closer to the opposite wall is not snapped onto it.
+        """
+        contact = self.half_width - self.robot_radius
+        best, best_error = None, self.radius
+        for i, (a, b) in enumerate(zip(self.path[:-1], self.path[1:])):
+            length = math.hypot(b[0] - a[0], b[1] - a[1])
+            ux, uy = (b[0] - a[0]) / length, (b[1] - a[1]) / length
+            along = (x - a[0]) * ux + (y - a[1]) * uy
+            across = (x - a[0]) * uy - (y - a[1]) * ux
+            if not -self.half_width <= along <= length + self.half_width:
+                continue
+            for side in (-1, 1):
+                if heading is not None:
+                    dx, dy = direction(heading)
+                    if side * (dx * uy - dy * ux) < -math.sqrt(0.5):
+                        continue  # Driving away from this wall (the heading may already be the next one's)
+                error = abs(side * contact - across)
+                wall_x = a[0] + along * ux + side * self.half_width * uy
+                wall_y = a[1] + along * uy - side * self.half_width * ux
+                if error <= best_error and not self.open_floor(wall_x, wall_y):
+                    best, best_error = (i, side), error
+        return best
+
+    def open_floor(self, x: float, y: float) -> bool:
+        """Whether (x, y) lies inside the corridor, i.e. a side line there is no wall (corner panels)"""
+        margin = self.half_width - 0.5
+        for a, b in zip(self.path[:-1], self.path[1:]):
+            length = math.hypot(b[0] - a[0], b[1] - a[1])
+            ux, uy = (b[0] - a[0]) / length, (b[1] - a[1]) / length
+            along = (x - a[0]) * ux + (y - a[1]) * uy
+            across = (x - a[0]) * uy - (y - a[1]) * ux
+            if abs(across) < margin and -margin < along < length + margin:
+                return True
+        return False
+
+    def correction(self, x: float, y: float, event: str,
+                   heading: Optional[float] = None) -> Optional[Correction]:
+        """Offset that puts the estimate a robot radius inside the matched wall, or None"""
+        matched = self.match(x, y, heading)
+        if matched is None:
+            return None
+        i, side = matched
+        (ax, ay), (bx, by) = self.path[i], self.path[i + 1]
+        length = math.hypot(bx - ax, by - ay)
+        nx, ny = (by - ay) / length, -(bx - ax) / length  # Unit normal to the right of travel
+        shift = side * (self.half_width - self.robot_radius) - ((x - ax) * nx + (y - ay) * ny)
+        dx, dy = shift * nx, shift * ny
+        self.corrections.append((i, event, dx, dy))
+        return (dx if abs(nx) > 1e-9 else None), (dy if abs(ny) > 1e-9 else None)
+
+    def max_correction(self) -> float:
+        return max((math.hypot(dx, dy) for _, _, dx, dy in self.corrections), default=0.0)
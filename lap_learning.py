@@ -0,0 +1,127 @@
+"""
+Iterative learning control
+After every lap each segment's end-point error against the waypoints updates
+a speed and a distance correction for the same segment on the next lap
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from json_store import load_entry, save_entry
+
+LEARNING_PATH = "lap_learning.json"
+
+# How a lap starts: standing on the start waypoint, or rolling on from the finish line
+STANDING, ROLLING = "standing", "rolling"
+
+
+class LapLearner:
+    """Per-segment corrections learned lap after lap
+
+    `distance[k]` lengthens (or shortens) segment k: a timed segment drives
+    that much further, a closed-loop one arrives that much later. It learns
+    away the along-track error at the segment end. `speed[k]` is added to
+    the segment's speed command: it rises by `speed_step` after every lap
+    the segment ended within `error_limit` and drops by a step otherwise.
+    A lap slower than the best one so far restores the best lap's speeds
+    and halves the step, so the speeds settle instead of oscillating.
+
+    Only laps with the same start are compared: a standing start is slower
+    than rolling on from the finish line. For the same reason the first
+    segment, which starts at the start waypoint or the finish line, learns
+    its distance change per start (`start_distance`).
+    """
+
+    def __init__(self, segments: int, distance_gain: float = 0.5, speed_step: float = 10.0,
+                 error_limit: float = 10.0, max_speed_delta: float = 80.0,
+                 max_distance: float = 40.0):
+        self.segments = segments
+        self.distance_gain = distance_gain      # Share of the along-track error corrected per lap
+        self.speed_step = speed_step            # Speed units added or removed per lap
+        self.error_limit = error_limit          # cm end-point error we are willing to accept
+        self.max_speed_delta = max_speed_delta  # Bound on the learned speed increase
+        self.max_distance = max_distance        # cm bound on the learned distance change
+        self.speed: List[float] = [0.0] * segments
+        self.distance: List[float] = [0.0] * segments
+        self.start_distance: Dict[str, float] = {STANDING: 0.0, ROLLING: 0.0}  # distance[0] per start
+        self.best_speed: List[float] = list(self.speed)
+        self.lap_times: Dict[str, List[float]] = {STANDING: [], ROLLING: []}
+        self.start = STANDING  # How the current lap started
+        self.errors: Dict[int, Tuple[float, float]] = {}  # This lap: segment -> (along, cross)
+
+    def begin_lap(self, start: str = STANDING):
+        self.start = start
+        self.distance[0] = self.start_distance[start]
+
+    def observe(self, segment: int, along: float, cross: float):
+        """End-point error of a segment this lap: along-track (+ = overshoot) and cross-track (cm)"""
+        self.errors[segment] = (along, cross)
+
+    def best_time(self, start: Optional[str] = None) -> Optional[float]:
+        """Best lap time with the given start (default: the current lap's)"""
+        return min(self.lap_times[start or self.start], default=None)
+
+    def laps(self) -> int:
+        return sum(len(times) for times in self.lap_times.values())
+
+    def end_lap(self, lap_time: float):
+        """Turn this lap's errors into corrections for the next one"""
+        best = self.best_time()
+        if best is not None and lap_time > best:
+            self.speed = list(self.best_speed)
+            self.speed_step /= 2
+        else:
+            self.best_speed = list(self.speed)
+        for segment, (along, cross) in self.errors.items():
+            distance = self.distance[segment] - self.distance_gain * along
+            self.distance[segment] = max(-self.max_distance, min(self.max_distance, distance))
+            step = self.speed_step if max(abs(along), abs(cross)) <= self.error_limit else -self.speed_step
+            self.speed[segment] = max(0.0, min(self.max_speed_delta, self.speed[segment] + step))
+        self.start_distance[self.start] = self.distance[0]
+        self.errors = {}
+        self.lap_times[self.start].append(lap_time)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {'speed': self.speed, 'distance': self.distance, 'start_distance': self.start_distance,
+                'best_speed': self.best_speed, 'speed_step': self.speed_step, 'lap_times': self.lap_times}
+
+    def load(self, data: Dict[str, object]) -> bool:
+        """Take over stored corrections if they were learned on the same number of segments"""
+        if len(data.get('speed', ())) != self.segments:
+            return False
+        self.speed = [float(v) for v in data['speed']]
+        self.distance = [float(v) for v in data['distance']]
+        self.best_speed = [float(v) for v in data.get('best_speed', self.speed)]
+        self.speed_step = float(data.get('speed_step', self.speed_step))
+        start_distance = data.get('start_distance', {})
+        for start in self.start_distance:
+            self.start_distance[start] = float(start_distance.get(start, self.distance[0]))
+        lap_times = data.get('lap_times', {})
+        if isinstance(lap_times, dict):  # Older files kept one list mixing both starts: dropped
+            for start in self.lap_times:
+                self.lap_times[start] = [float(t) for t in lap_times.get(start, ())]
+        return True
+
+
+def load_learner(learner: LapLearner, key: str, path: str = LEARNING_PATH) -> bool:
+    """Restore the corrections stored under `key` into `learner`"""
+    entry = load_entry(path, key)
+    return entry is not None and learner.load(entry)
+
+
+def save_learner(learner: LapLearner, key: str, path: str = LEARNING_PATH):
+    """Store the corrections under `key`, keeping other courses and modes in the file"""
+    save_entry(path, key, learner.to_dict())
+
+
+def end_point_error(start: Tuple[float, float], end: Tuple[float, float],
+                    position: Tuple[float, float]) -> Tuple[float, float]:
+    """Along-track (+ = past the end) and signed cross-track (+ = right of travel) error"""
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    length = (dx * dx + dy * dy) ** 0.5 or 1e-9
+    ux, uy = dx / length, dy / length
+    ex, ey = position[0] - end[0], position[1] - end[1]
+    return ex * ux + ey * uy, ex * uy - ey * ux
+
+
+def learning_key(surface: Optional[str], segments: int, mode: str) -> str:
+    return f"{surface or 'default'}/{segments}/{mode}"
@@ -0,0 +1,90 @@
+"""
+Lap timing
+Split times from crossings of the start/finish line: a gate through the
+finish waypoint, square to the finishing heading, fed with course positions
+"""
+
+from typing import List, Optional, Tuple
+
+from course import Point, direction
+
+
+class LapTimer:
+    """Detects forward crossings of the finish line and keeps the lap splits
+
+    A crossing only counts when the robot was at least `rearm` cm behind
+    the line since the previous one, so locator noise on the line cannot
+    produce extra laps. A robot starting just behind the line (inside the
+    gate) has a rolling start: its first crossing starts lap 1.
+    """
+
+    def __init__(self, point: Point, heading: float, half_width: float, rearm: float = 10.0):
+        self.point = point
+        self.forward = direction(heading)
+        self.half_width = half_width  # cm either side of the finish waypoint
+        self.rearm = rearm
+        self.start_time: Optional[float] = None
+        self.crossings: List[float] = []
+        self.laps: List[float] = []
+        self.reported = 0
+        self.rolling = False
+        self._started = False
+        self._armed = False
+        self._last: Optional[Tuple[float, float]] = None  # (t, distance past the line)
+
+    def start(self, t: float, x: float, y: float):
+        """Start the race at `t` from (x, y)"""
+        along, side = self.offsets(x, y)
+        self.rolling = along < 0 and abs(side) <= self.half_width
+        self.start_time = None if self.rolling else t
+        self._started = True
+        self._last = (t, along)  # A first sample already past the line still crosses it
+
+    def offsets(self, x: float, y: float) -> Tuple[float, float]:
+        """Distance past the line (along the finishing heading) and sideways from the gate centre"""
+        dx, dy = x - self.point[0], y - self.point[1]
+        fx, fy = self.forward
+        return dx * fx + dy * fy, dx * fy - dy * fx
+
+    def update(self, t: float, x: float, y: float) -> Optional[float]:
+        """Feed one position; returns the lap time when it completed a lap"""
+        if not self._started:
+            return None
+        along, side = self.offsets(x, y)
+        last, self._last = self._last, (t, along)
+        if along <= -self.rearm:
+            self._armed = True
+        crossed = last is not None and last[1] < 0 <= along and abs(side) <= self.half_width
+        if not crossed or not (self._armed or self.start_time is None):
+            return None
+        # Interpolate the moment the line was crossed between the two samples
+        t_cross = last[0] + (t - last[0]) * -last[1] / (along - last[1]) if along > last[1] else t
+        if self.start_time is None:  # Rolling start
+            self.start_time = t_cross
+            self._armed = False
+            return None
+        return self._complete(t_cross)
+
+    def finish(self, t: float, laps: int):
+        """Close the last lap at `t` if the robot stopped on the line without crossing it"""
+        if self.start_time is not None and len(self.laps) < laps:
+            self._complete(t)
+
+    def _complete(self, t: float) -> float:
+        previous = self.crossings[-1] if self.crossings else self.start_time
+        self.crossings.append(t)
+        self.laps.append(t - previous)
+        self._armed = False
+        return self.laps[-1]
+
+    def new_laps(self) -> List[Tuple[int, float]]:
+        """(lap number, lap time) of the laps completed since the last call"""
+        laps = [(i + 1, self.laps[i]) for i in range(self.reported, len(self.laps))]
+        self.reported += len(laps)
+        return laps
+
+    def best_lap(self) -> Optional[Tuple[int, float]]:
+        if not self.laps:
+            return None
+        best = min(range(len(self.laps)), key=self.laps.__getitem__)
+        return best + 1, self.laps[best]
@@ -0,0 +1,186 @@
+"""
+Pose estimator
+Extended Kalman filter over course position, heading, speed and gyro bias:
+gyroscope and accelerometer drive the prediction, locator position and
+velocity correct it
+"""
+
+import math
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+Matrix = List[List[float]]
+
+X, Y, YAW, V, BIAS = range(5)  # State: cm, cm, rad clockwise from course +x, cm/s, rad/s
+
+G = 981.0  # cm/s^2 per g
+
+
+def _matmul(a: Matrix, b: Matrix) -> Matrix:
+    return [[sum(a[i][k] * b[k][j] for k in range(len(b))) for j in range(len(b[0]))]
+            for i in range(len(a))]
+
+
+def _transpose(a: Matrix) -> Matrix:
+    return [list(row) for row in zip(*a)]
+
+
+def _wrap(angle: float) -> float:
+    return (angle + math.pi) % (2 * math.pi) - math.pi
+
+
+def velocity_model(state: Sequence[float]) -> Tuple[Tuple[float, float], Matrix]:
+    """Course velocity (cm/s) the state predicts and its Jacobian (2x5)"""
+    _, _, yaw, v, _ = state
+    cos, sin = math.cos(yaw), math.sin(yaw)
+    return (v * cos, -v * sin), [[0.0, 0.0, -v * sin, cos, 0.0], [0.0, 0.0, -v * cos, -sin, 0.0]]
+
+
+class PoseEstimator:
+    """EKF pose in course coordinates, fed one sensor sample at a time
+
+    Locator readings further than `gate` standard deviations from the
+    prediction (drift jumps, wheel slip after a spin) are rejected, unless
+    `max_rejections` in a row were: then the filter has lost track instead.
+    """
+
+    def __init__(self, locator_noise: float = 2.0, velocity_noise: float = 5.0,
+                 gyro_noise: float = 0.05, accel_noise: float = 30.0,
+                 bias_noise: float = 0.002, gate: float = 4.0, max_rejections: int = 10):
+        self.locator_noise = locator_noise    # cm, std of a locator position
+        self.velocity_noise = velocity_noise  # cm/s, std of a locator velocity
+        self.gyro_noise = gyro_noise          # rad/s, std of the yaw rate
+        self.accel_noise = accel_noise        # cm/s^2, std of the forward acceleration
+        self.bias_noise = bias_noise          # rad/s per sqrt(s), gyro bias random walk
+        self.gate = gate
+        self.max_rejections = max_rejections
+        self.state: List[float] = [0.0] * 5
+        self.covariance: Matrix = [[0.0] * 5 for _ in range(5)]
+        self.last_t: Optional[float] = None
+        self.rejected = 0
+        self._rejected_run = 0
+        self._lock = threading.Lock()
+
+    def reset(self, x: float, y: float, heading: float, t: Optional[float] = None):
+        """Start from a known pose (course heading in degrees, robot standing still)"""
+        with self._lock:
+            self.state = [x, y, math.radians(heading), 0.0, 0.0]
+            self.covariance = [[0.0] * 5 for _ in range(5)]
+            for i, variance in enumerate((1.0, 1.0, math.radians(2) ** 2, 1.0, 0.01 ** 2)):
+                self.covariance[i][i] = variance
+            self.last_t = t
+            self.rejected = 0
+            self._rejected_run = 0
+
+    def shift(self, dx: Optional[float] = None, dy: Optional[float] = None):
+        """Position fix (landmark): move the estimate by the offset on each axis that was measured
+
+        A measured axis gets the locator's uncertainty and loses its
+        correlations; an axis left as None keeps both.
+        """
+        with self._lock:
+            for i, offset in ((X, dx), (Y, dy)):
+                if offset is None:
+                    continue
+                self.state[i] += offset
+                self._fix(i, self.locator_noise ** 2)
+
+    def fix_heading(self, heading: float, std: float = math.radians(2)):
+        """Heading fix (a turn in place done): set the yaw and its uncertainty, position untouched"""
+        with self._lock:
+            self.state[YAW] = _wrap(math.radians(heading))
+            self._fix(YAW, std ** 2)
+
+    def _fix(self, i: int, variance: float):
+        """State `i` was just measured: drop its correlations; caller holds the lock"""
+        for j in range(5):
+            self.covariance[i][j] = self.covariance[j][i] = 0.0
+        self.covariance[i][i] = variance
+
+    # --- Filter steps ---
+
+    def predict(self, dt: float, yaw_rate: float, acceleration: float):
+        """Dead-reckon `dt` seconds with a clockwise yaw rate (rad/s) and forward acceleration"""
+        x, y, yaw, v, bias = self.state
+        cos, sin = math.cos(yaw), math.sin(yaw)
+        self.state = [x + v * cos * dt, y - v * sin * dt, _wrap(yaw + (yaw_rate - bias) * dt),
+                      v + acceleration * dt, bias]
+
+        f = [[1.0 if i == j else 0.0 for j in range(5)] for i in range(5)]
+        f[X][YAW], f[X][V] = -v * sin * dt, cos * dt
+        f[Y][YAW], f[Y][V] = -v * cos * dt, -sin * dt
+        f[YAW][BIAS] = -dt
+        p = _matmul(_matmul(f, self.covariance), _transpose(f))
+        for i, noise in ((YAW, self.gyro_noise), (V, self.accel_noise), (BIAS, self.bias_noise)):
+            p[i][i] += noise * noise * dt
+        for i in (X, Y):
+            p[i][i] += (self.velocity_noise * dt) ** 2
+        self.covariance = p
+
+    def correct(self, residual: Sequence[float], h: Matrix, noise: float, gated: bool = False) -> bool:
+        """Two-dimensional measurement update; returns False when the reading was gated out"""
+        p = self.covariance
+        ph = _matmul(p, _transpose(h))                       # 5x2
+        s = _matmul(h, ph)                                   # 2x2
+        s[0][0] += noise * noise
+        s[1][1] += noise * noise
+        det = s[0][0] * s[1][1] - s[0][1] * s[1][0]
+        if det <= 0:
+            return False
+        s_inv = [[s[1][1] / det, -s[0][1] / det], [-s[1][0] / det, s[0][0] / det]]
+        if gated:
+            r0, r1 = residual
+            distance = r0 * (s_inv[0][0] * r0 + s_inv[0][1] * r1) + r1 * (s_inv[1][0] * r0 + s_inv[1][1] * r1)
+            if distance > self.gate * self.gate:
+                return False
+        k = _matmul(ph, s_inv)                               # 5x2
+        for i in range(5):
+            self.state[i] += k[i][0] * residual[0] + k[i][1] * residual[1]
+        self.state[YAW] = _wrap(self.state[YAW])
+        kh = _matmul(k, h)
+        self.covariance = [[p[i][j] - sum(kh[i][m] * p[m][j] for m in range(5)) for j in range(5)]
+                           for i in range(5)]
+        return True
+
+    def update(self, t: float, position: Tuple[float, float], velocity: Tuple[float, float],
+               gyro_z: float, accel_y: float):
+        """Fuse one sample: course position (cm) and velocity (cm/s),
+        gyroscope z (deg/s, counter-clockwise) and forward acceleration (g)"""
+        with self._lock:
+            if self.last_t is not None and t > self.last_t:
+                self.predict(t - self.last_t, -math.radians(gyro_z), accel_y * G)
+            self.last_t = t
+
+            x, y = self.state[X], self.state[Y]
+            position_h = [[1.0, 0.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0, 0.0]]
+            gated = self._rejected_run < self.max_rejections
+            if self.correct((position[0] - x, position[1] - y), position_h, self.locator_noise, gated):
+                self._rejected_run = 0
+            else:
+                self.rejected += 1
+                self._rejected_run += 1
+
+            (vx, vy), velocity_h = velocity_model(self.state)
+            self.correct((velocity[0] - vx, velocity[1] - vy), velocity_h, self.velocity_noise)
+
+    # --- Outputs ---
+
+    def position(self) -> Tuple[float, float]:
+        with self._lock:
+            return self.state[X], self.state[Y]
+
+    def velocity(self) -> Tuple[float, float]:
+        """Course velocity (cm/s)"""
+        with self._lock:
+            _, _, yaw, v, _ = self.state
+            return v * math.cos(yaw), -v * math.sin(yaw)
+
+    def heading(self) -> float:
+        """Course heading in degrees (0-360, clockwise)"""
+        with self._lock:
+            return math.degrees(self.state[YAW]) % 360
+
+    def uncertainty(self) -> float:
+        """Position standard deviation (cm, larger axis)"""
+        with self._lock:
+            return math.sqrt(max(self.covariance[X][X], self.covariance[Y][Y]))
@@ -0,0 +1,81 @@
+"""
+Pure-pursuit path tracker
+Follows the waypoint polyline by steering at a point a fixed distance ahead
+"""
+
+import math
+from typing import List, Tuple
+
+from course import Point, Waypoint, centre_line, heading_between
+from headings import shortest_turn
+
+
+class PurePursuitTracker:
+    """Tracks a waypoint polyline; feed it the robot position every control tick"""
+
+    def __init__(self, waypoints: List[Waypoint], lookahead: float = 30.0,
+                 goal_tolerance: float = 3.0):
+        self.path: List[Point] = centre_line(waypoints)
+        self.lookahead = lookahead
+        self.goal_tolerance = goal_tolerance
+        self.progress = 0.0  # Arc length (cm) of the closest path point so far
+
+        self.stations = [0.0]  # Arc length at every path vertex
+        for a, b in zip(self.path[:-1], self.path[1:]):
+            self.stations.append(self.stations[-1] + math.hypot(b[0] - a[0], b[1] - a[1]))
+        self.length = self.stations[-1]
+
+    def point_at(self, s: float) -> Point:
+        """Path point `s` cm from the start (clamped to the ends)"""
+        s = max(0.0, min(self.length, s))
+        for i in range(len(self.path) - 1):
+            if s <= self.stations[i + 1] or i == len(self.path) - 2:
+                a, b = self.path[i], self.path[i + 1]
+                span = self.stations[i + 1] - self.stations[i]
+                t = (s - self.stations[i]) / span if span > 0 else 0.0
+                return a[0] + (b[0] - a[0]) * t, a[1] + (b[1] - a[1]) * t
+        return self.path[-1]
+
+    def tangent_at(self, s: float) -> float:
+        """Path heading `s` cm from the start"""
+        return heading_between(self.point_at(s - 1), self.point_at(s + 1))
+
+    def project(self, x: float, y: float) -> float:
+        """Arc length of the closest path point near the current progress
+
+        Only the stretch just behind to two lookaheads ahead is searched, so
+        neighbouring lanes of the course are never mistaken for our own.
+        """
+        low, high = self.progress - self.lookahead / 2, self.progress + 2 * self.lookahead
+        best_s, best_d = self.progress, math.inf
+        for i in range(len(self.path) - 1):
+            if self.stations[i + 1] < low or self.stations[i] > high:
+                continue
+            (ax, ay), (bx, by) = self.path[i], self.path[i + 1]
+            span = self.stations[i + 1] - self.stations[i]
+            t = ((x - ax) * (bx - ax) + (y - ay) * (by - ay)) / (span * span) if span > 0 else 0.0
+            t = max(0.0, min(1.0, t))
+            d = math.hypot(ax + (bx - ax) * t - x, ay + (by - ay) * t - y)
+            if d < best_d:
+                best_s, best_d = self.stations[i] + span * t, d
+        return best_s
+
+    def update(self, x: float, y: float) -> Tuple[float, float]:
+        """Steering heading towards the lookahead point and the path heading change ahead
+
+        Returns (heading, turn) where turn is the largest absolute heading
+        change of the path within two lookaheads, for choosing a speed.
+        """
+        self.progress = max(self.progress, self.project(x, y))
+        target = self.point_at(self.progress + self.lookahead)
+        heading = heading_between((x, y), target)
+
+        here = self.tangent_at(self.progress)
+        turn = 0.0
+        for k in range(1, 5):
+            ahead = self.tangent_at(self.progress + self.lookahead * k / 2)
+            turn = max(turn, abs(shortest_turn(here, ahead)))
+        return heading, turn
+
+    def finished(self) -> bool:
+        return self.progress >= self.length - self.goal_tolerance
@@ -0,0 +1,138 @@
+"""
+Racing-line optimizer
+Treats every panel as a corridor around the centre line and relaxes an
+elastic band inside it: apexes, corner cutting and a shorter path
+"""
+
+import math
+from typing import List, Optional, Tuple
+
+from course import Point, Waypoint, centre_line, heading_between, path_length
+from speed_profile import RobotModel, lap_time, plan_speed_profile
+
+# Curvature/length blends tried when optimizing for lap time
+LENGTH_WEIGHTS = (0.0, 0.01, 0.02, 0.025, 0.03, 0.04, 0.05, 0.1, 0.3, 1.0)
+
+
+def _corridor_samples(centre: List[Point], half_width: float,
+                      spacing: float) -> List[Tuple[Point, Point, float]]:
+    """Sample the centre line as (centre point, unit normal, allowed offset)"""
+    samples = []
+    for i, (a, b) in enumerate(zip(centre[:-1], centre[1:])):
+        length = math.hypot(b[0] - a[0], b[1] - a[1])
+        ux, uy = (b[0] - a[0]) / length, (b[1] - a[1]) / length
+        normal = (-uy, ux)
+        if i > 0:
+            # Corner: offset along the bisector, out to the corner of the panel
+            prev_len = math.hypot(a[0] - centre[i - 1][0], a[1] - centre[i - 1][1])
+            vx, vy = (a[0] - centre[i - 1][0]) / prev_len, (a[1] - centre[i - 1][1]) / prev_len
+            nx, ny = -vy + normal[0], vx + normal[1]
+            norm = math.hypot(nx, ny)
+            if norm > 1e-9:
+                cos_half = max(0.5, (nx * normal[0] + ny * normal[1]) / norm)
+                samples.append((a, (nx / norm, ny / norm), half_width / cos_half))
+            else:
+                samples.append((a, normal, 0.0))  # U-turn: keep to the centre
+        else:
+            samples.append((a, normal, 0.0))  # Start position is fixed
+        steps = max(1, int(length // spacing))
+        for k in range(1, steps):
+            t = k / steps
+            samples.append(((a[0] + ux * length * t, a[1] + uy * length * t), normal, half_width))
+    samples.append((centre[-1], samples[-1][1], 0.0))  # Finish is fixed too
+    return samples
+
+
+def _simplify(points: List[Point], tolerance: float) -> List[Point]:
+    """Ramer-Douglas-Peucker polyline simplification"""
+    if len(points) < 3:
+        return points
+    (ax, ay), (bx, by) = points[0], points[-1]
+    length = math.hypot(bx - ax, by - ay) or 1e-9
+    worst, index = 0.0, 0
+    for i in range(1, len(points) - 1):
+        px, py = points[i]
+        error = abs((bx - ax) * (ay - py) - (ax - px) * (by - ay)) / length
+        if error > worst:
+            worst, index = error, i
+    if worst <= tolerance:
+        return [points[0], points[-1]]
+    return _simplify(points[:index + 1], tolerance)[:-1] + _simplify(points[index:], tolerance)
+
+
+def _relax(samples: List[Tuple[Point, Point, float]], length_weight: float,
+           iterations: int, over_relaxation: float = 1.9) -> List[Point]:
+    """Relax the band inside the corridor (projected SOR Gauss-Seidel)
+
+    Each sample moves along its normal towards the point that minimises the
+    squared curvature around it, blended with the neighbours' midpoint
+    (shortest path) by `length_weight`.
+    """
+    offsets = [0.0] * len(samples)
+    last = len(samples) - 1
+
+    def position(k: int) -> Point:
+        (cx, cy), (nx, ny), _ = samples[k]
+        return cx + nx * offsets[k], cy + ny * offsets[k]
+
+    for _ in range(iterations):
+        for k in range(1, last):
+            (cx, cy), (nx, ny), limit = samples[k]
+            ax, ay = position(k - 1)
+            bx, by = position(k + 1)
+            tx, ty = (ax + bx) / 2, (ay + by) / 2
+            if 2 <= k <= last - 2:
+                aax, aay = position(k - 2)
+                bbx, bby = position(k + 2)
+                smooth_x = (4 * (ax + bx) - aax - bbx) / 6
+                smooth_y = (4 * (ay + by) - aay - bby) / 6
+                tx = length_weight * tx + (1 - length_weight) * smooth_x
+                ty = length_weight * ty + (1 - length_weight) * smooth_y
+            target = (tx - cx) * nx + (ty - cy) * ny
+            offset = offsets[k] + over_relaxation * (target - offsets[k])
+            offsets[k] = max(-limit, min(limit, offset))
+    return [position(k) for k in range(len(samples))]
+
+
+def optimize_racing_line(waypoints: List[Waypoint], half_width: float = 20.0,
+                         length_weight: float = 0.05, model: Optional[RobotModel] = None,
+                         spacing: float = 10.0, iterations: int = 300,
+                         tolerance: float = 0.5,
+                         baseline: Optional[List[Waypoint]] = None) -> List[Waypoint]:
+    """Compute a racing line through the panel corridors
+
+    Every sample of the centre line may move sideways by up to `half_width`
+    cm (more along the bisector in corners). `length_weight` trades a
+    smooth line (0) against the shortest one (1). With a RobotModel the
+    blend with the lowest planned lap time is picked instead, among the
+    lines no longer than the centre line (the planner does not charge the
+    per-waypoint cost of a long, dense line), and `baseline` (e.g. the
+    cornering arcs) is returned when none of them plans faster. Returns a
+    waypoint list in the same format as SpheroRacer.waypoints: each heading
+    is that of the segment leading to the point.
+    """
+    centre = centre_line(waypoints)
+    samples = _corridor_samples(centre, half_width, spacing)
+    weights = LENGTH_WEIGHTS if model is not None else (length_weight,)
+    max_length = path_length(centre) + 1e-6
+
+    best, best_time = [], math.inf
+    if model is not None and baseline:
+        best, best_time = baseline, lap_time(plan_speed_profile(baseline, model))
+    for weight in weights:
+        line = _simplify(_relax(samples, weight, iterations), tolerance)
+        if model is not None and path_length(line) > max_length:
+            continue
+        result = [(line[0][0], line[0][1], waypoints[0][2])]
+        for a, b in zip(line[:-1], line[1:]):
+            result.append((b[0], b[1], round(heading_between(a, b)) % 360))
+        planned = lap_time(plan_speed_profile(result, model)) if model is not None else 0.0
+        if planned < best_time:
+            best, best_time = result, planned
+    return best
+
+
+def line_gain(waypoints: List[Waypoint], racing_line: List[Waypoint]) -> float:
+    """Relative path-length saving of the racing line over the centre line"""
+    centre = path_length(centre_line(waypoints))
+    return 1 - path_length(centre_line(racing_line)) / centre
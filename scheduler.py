@@ -0,0 +1,59 @@
+"""
+Deadline scheduler
+Plans absolute deadlines on a monotonic clock so timing error stays bounded
+instead of piling up with every sleep, print and BLE round trip
+"""
+
+import time
+from typing import Callable
+
+
+class DeadlineScheduler:
+    """Sleeps until absolute deadlines measured from the start of the race"""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter,
+                 sleep: Callable[[float], None] = time.sleep, spin: float = 0.002):
+        self.clock = clock
+        self.sleep = sleep
+        self.spin = spin          # Final stretch (s) busy-waited for precision
+        self.origin = clock()
+        self.deadline = self.origin
+        self.max_lateness = 0.0   # Worst overshoot past a deadline (s)
+
+    def start(self) -> float:
+        """Start a new timeline at the current time"""
+        self.origin = self.deadline = self.clock()
+        self.max_lateness = 0.0
+        return self.origin
+
+    def now(self) -> float:
+        """Seconds since the timeline started"""
+        return self.clock() - self.origin
+
+    def sync(self):
+        """Re-anchor the next deadline at the current time (after an event-driven wait)"""
+        self.deadline = max(self.deadline, self.clock())
+
+    def sleep_until(self, deadline: float) -> float:
+        """Sleep until an absolute clock deadline, return how late we woke up"""
+        remaining = deadline - self.clock()
+        if remaining > self.spin:
+            self.sleep(remaining - self.spin)
+        while self.spin and self.clock() < deadline:
+            pass  # No spin (spin=0) on clocks that only move when slept on
+        lateness = self.clock() - deadline
+        self.max_lateness = max(self.max_lateness, lateness)
+        return lateness
+
+    def wait(self, duration: float) -> float:
+        """Advance the planned timeline by `duration` and sleep until that deadline
+
+        Time spent since the previous deadline (prints, BLE calls) is taken
+        out of this wait instead of being added to it. A loop that overran a
+        whole interval drops it instead of rushing through the backlog.
+        """
+        self.deadline += duration
+        now = self.clock()
+        if now - self.deadline > duration:
+            self.deadline = now
+        return self.sleep_until(self.deadline)
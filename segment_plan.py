@@ -0,0 +1,30 @@
+"""
+Segment plan
+How the segment loop drives a moving segment: which class of segment it is
+(and so which speed setting drives it) and how fast that is expected to go;
+shared by the racer and the batch simulator
+"""
+
+from headings import is_turn, shortest_turn
+
+# Segment classes, each driven at its own speed setting
+STRAIGHT = "straight"
+TURN = "turn"
+APPROACH = "approach"
+
+
+def segment_class(start_heading: float, end_heading: float, distance: float, panel_size: float) -> str:
+    """STRAIGHT, TURN (driven as a turn segment) or APPROACH (chord of a cornering arc)"""
+    turn = abs(shortest_turn(start_heading, end_heading))
+    if 0 < turn and not is_turn(start_heading, end_heading) and distance < panel_size:
+        return APPROACH
+    if is_turn(start_heading, end_heading):
+        return TURN
+    return STRAIGHT
+
+
+def expected_velocity(speed: float, turning: bool = False, speed_table=None) -> float:
+    """Expected cm/s at a speed command: the calibrated table, else the old estimates"""
+    if speed_table is not None:
+        return speed_table.to_cms(speed)
+    return speed * (0.6 if turning else 0.8)  # Slower for turns
@@ -0,0 +1,172 @@
+"""
+High-rate sensor streaming
+Locator, velocity, gyroscope and accelerometer samples land in a fixed-size
+ring buffer that controllers and loggers read without extra BLE requests
+"""
+
+import threading
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from scheduler import DeadlineScheduler
+
+# Columns of one sample; positions/velocities in the locator frame (cm, cm/s),
+# gyroscope in deg/s, acceleration in g, heading/speed as last commanded
+STREAM_FIELDS = ("t", "x", "y", "vx", "vy",
+                 "gyro_x", "gyro_y", "gyro_z", "accel_x", "accel_y", "accel_z",
+                 "heading", "speed")
+STREAM_INDEX = {name: i for i, name in enumerate(STREAM_FIELDS)}
+
+STREAM_INTERVAL = 10          # ms, shortest streaming interval we run the firmware at
+DEFAULT_STREAM_INTERVAL = 150  # ms, spherov2's own streaming interval, restored on stop
+
+
+class SensorRing:
+    """Fixed-capacity ring of sensor samples in one preallocated array of doubles
+
+    Memory never grows: once full, the oldest sample is overwritten. Readers
+    keep a cursor (the `written` count they last saw) to pick up new samples.
+    """
+
+    def __init__(self, capacity: int = 4096, fields: Sequence[str] = STREAM_FIELDS):
+        self.fields = tuple(fields)
+        self.width = len(self.fields)
+        self.capacity = capacity
+        self.data = array('d', bytes(8 * capacity * self.width))
+        self.written = 0  # Samples appended since creation
+        self._index = {name: i for i, name in enumerate(self.fields)}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self.written, self.capacity)
+
+    def append(self, values: Sequence[float]):
+        with self._lock:
+            start = (self.written % self.capacity) * self.width
+            for k, value in enumerate(values):
+                self.data[start + k] = value
+            self.written += 1
+
+    def _row(self, n: int) -> Tuple[float, ...]:
+        """Sample number `n` (counted from creation); caller holds the lock"""
+        start = (n % self.capacity) * self.width
+        return tuple(self.data[start:start + self.width])
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        """Newest sample as {field: value}, or None before the first one"""
+        with self._lock:
+            if not self.written:
+                return None
+            return dict(zip(self.fields, self._row(self.written - 1)))
+
+    def since(self, cursor: int) -> Tuple[List[Tuple[float, ...]], int]:
+        """Samples appended after `cursor`, oldest first, and the new cursor
+
+        Samples already overwritten are skipped; a reader that fell more than
+        `capacity` samples behind only gets the newest `capacity`.
+        """
+        with self._lock:
+            first = max(cursor, self.written - self.capacity)
+            return [self._row(n) for n in range(first, self.written)], self.written
+
+    def column(self, name: str, count: Optional[int] = None) -> array:
+        """The newest `count` values (default: all buffered) of one field, oldest first"""
+        offset = self._index[name]
+        with self._lock:
+            available = min(self.written, self.capacity)
+            count = available if count is None else min(count, available)
+            return array('d', (self.data[(n % self.capacity) * self.width + offset]
+                               for n in range(self.written - count, self.written)))
+
+
+def _sample(t: float, location: Dict[str, float], velocity: Dict[str, float],
+            gyroscope: Dict[str, float], acceleration: Dict[str, float],
+            heading: float, speed: float) -> Tuple[float, ...]:
+    return (t, location['x'], location['y'], velocity['x'], velocity['y'],
+            gyroscope.get('x', 0.0), gyroscope.get('y', 0.0), gyroscope.get('z', 0.0),
+            acceleration.get('x', 0.0), acceleration.get('y', 0.0), acceleration.get('z', 0.0),
+            heading, speed)
+
+
+class SensorStream:
+    """Feeds a SensorRing from the robot
+
+    On a real BOLT the firmware's sensor stream is subscribed to and its
+    interval shortened; anything without a sensor_control (the simulator on
+    the wall clock) is polled from a background thread at the same interval
+    instead.
+    """
+
+    def __init__(self, api, ring: SensorRing, interval: float = STREAM_INTERVAL / 1000,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.api = api
+        self.ring = ring
+        self.interval = interval  # s between samples
+        self.clock = clock
+        self.mode: Optional[str] = None  # 'stream' or 'poll' while running
+        self.listeners: List[Callable[[Tuple[float, ...]], None]] = []  # Called with every sample
+        self._sensor_control = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self.mode is not None
+
+    def start(self) -> str:
+        """Start filling the ring; returns the mode used"""
+        toy = getattr(self.api, "_SpheroEduAPI__toy", None)
+        sensor_control = getattr(toy, "sensor_control", None)
+        if sensor_control is not None and hasattr(sensor_control, "add_sensor_data_listener"):
+            sensor_control.add_sensor_data_listener(self._on_sensor_data)
+            sensor_control.set_interval(max(STREAM_INTERVAL, int(self.interval * 1000)))
+            self._sensor_control = sensor_control
+            self.mode = "stream"
+        else:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._poll, name="sphero-sensors", daemon=True)
+            self._thread.start()
+            self.mode = "poll"
+        return self.mode
+
+    def stop(self):
+        if self._sensor_control is not None:
+            self._sensor_control.remove_sensor_data_listener(self._on_sensor_data)
+            self._sensor_control.set_interval(DEFAULT_STREAM_INTERVAL)
+            self._sensor_control = None
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.mode = None
+
+    def latest(self, max_age: float) -> Optional[Dict[str, float]]:
+        """Newest sample if it is at most `max_age` seconds old"""
+        sample = self.ring.latest()
+        if sample is None or self.clock() - sample['t'] > max_age:
+            return None
+        return sample
+
+    def _on_sensor_data(self, data: Dict[str, Dict[str, float]]):
+        """Firmware stream callback: one dict per enabled sensor"""
+        if 'locator' not in data or 'velocity' not in data:
+            return
+        self._record(_sample(self.clock(), data['locator'], data['velocity'],
+                             data.get('gyroscope', {}), data.get('accelerometer', {}),
+                             self.api.get_heading(), self.api.get_speed()))
+
+    def _poll(self):
+        scheduler = DeadlineScheduler(self.clock, spin=0)
+        scheduler.start()
+        api = self.api
+        while not self._stop.is_set():
+            self._record(_sample(self.clock(), api.get_location(), api.get_velocity(),
+                                 api.get_gyroscope(), api.get_acceleration(),
+                                 api.get_heading(), api.get_speed()))
+            scheduler.wait(self.interval)
+
+    def _record(self, sample: Tuple[float, ...]):
+        self.ring.append(sample)
+        for listener in self.listeners:
+            listener(sample)
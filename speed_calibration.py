@@ -0,0 +1,98 @@
+"""
+Speed calibration
+Drives a sweep of speed commands, measures the real velocity on the locator
+and keeps one interpolated speed -> cm/s lookup table per surface
+"""
+
+import math
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from json_store import load_entry, save_entry
+
+CALIBRATION_SPEEDS = (30, 60, 90, 120, 150, 180, 210, 240, 255)
+CALIBRATION_PATH = "speed_calibration.json"
+
+
+class SpeedTable:
+    """Measured velocity per speed command, linear between the calibration points"""
+
+    def __init__(self, points: Sequence[Tuple[float, float]]):
+        points = sorted((float(s), float(v)) for s, v in points if s > 0)
+        if not points:
+            raise ValueError("A speed table needs at least one calibration point")
+        self.points: List[Tuple[float, float]] = [(0.0, 0.0)] + points
+
+    def to_cms(self, speed: float) -> float:
+        """Speed command (0-255) to cm/s; beyond the last point the last slope continues"""
+        points = self.points
+        for (s0, v0), (s1, v1) in zip(points[:-1], points[1:]):
+            if speed <= s1 or (s1, v1) == points[-1]:
+                return v0 + (v1 - v0) * (speed - s0) / (s1 - s0) if s1 > s0 else v1
+        return points[-1][1]
+
+    def to_speed(self, velocity: float) -> float:
+        """cm/s to the (fractional) speed command that produces it"""
+        points = self.points
+        for (s0, v0), (s1, v1) in zip(points[:-1], points[1:]):
+            if velocity <= v1 or (s1, v1) == points[-1]:
+                return s0 + (s1 - s0) * (velocity - v0) / (v1 - v0) if v1 > v0 else s1
+        return points[-1][0]
+
+    def to_dict(self) -> Dict[str, object]:
+        return {'points': [list(point) for point in self.points[1:]]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "SpeedTable":
+        return cls([tuple(point) for point in data['points']])
+
+
+def load_speed_table(surface: str, path: str = CALIBRATION_PATH) -> Optional[SpeedTable]:
+    """Calibration of `surface` from the JSON file, or None if it was never calibrated"""
+    entry = load_entry(path, surface)
+    return SpeedTable.from_dict(entry) if entry is not None else None
+
+
+def save_speed_table(table: SpeedTable, surface: str, path: str = CALIBRATION_PATH):
+    """Store the calibration of `surface`, keeping the other surfaces in the file"""
+    save_entry(path, surface, dict(table.to_dict(), calibrated=time.strftime("%Y-%m-%d %H:%M:%S")))
+
+
+def measure_velocity(api, speed: int, heading: int, window: float = 0.5,
+                     max_settle: float = 2.5, poll: float = 0.05,
+                     clock: Callable[[], float] = time.monotonic,
+                     sleep: Callable[[float], None] = time.sleep) -> float:
+    """Drive at `speed` until the velocity settles, then measure cm/s on the locator over `window`"""
+    api.set_heading(heading)
+    api.set_speed(speed)
+
+    # Settled once two polls in a row agree within 2%
+    deadline = clock() + max_settle
+    previous = -1.0
+    while clock() < deadline:
+        sleep(poll)
+        velocity = api.get_velocity()
+        current = math.hypot(velocity['x'], velocity['y'])
+        if current > 0 and abs(current - previous) <= 0.02 * current:
+            break
+        previous = current
+
+    start, t0 = api.get_location(), clock()
+    sleep(window)
+    end, t1 = api.get_location(), clock()
+    api.set_speed(0)
+    return math.hypot(end['x'] - start['x'], end['y'] - start['y']) / (t1 - t0)
+
+
+def calibrate_speeds(api, speeds: Sequence[int] = CALIBRATION_SPEEDS, brake: float = 1.5,
+                     sleep: Callable[[float], None] = time.sleep, **measure) -> SpeedTable:
+    """Run the sweep back and forth along heading 0°/180° (needs about 3.5m of free straight)"""
+    points = []
+    for i, speed in enumerate(speeds):
+        heading = 0 if i % 2 == 0 else 180
+        velocity = measure_velocity(api, speed, heading, sleep=sleep, **measure)
+        print(f"   speed {speed:>3} → {velocity:6.1f} cm/s")
+        points.append((speed, velocity))
+        sleep(brake)
+    api.set_heading(0)
+    return SpeedTable(points)
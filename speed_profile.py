@@ -0,0 +1,196 @@
+"""
+Trapezoidal speed-profile planner
+Turns the waypoint list into per-segment accelerate / cruise / brake profiles
+Limits come from a configurable RobotModel
+"""
+
+import math
+from typing import List, Optional, Tuple
+
+from headings import TURN_THRESHOLD, shortest_turn
+
+Waypoint = Tuple[float, float, float]
+
+
+class RobotModel:
+    """Physical limits of the robot used by the planner"""
+
+    def __init__(self, max_speed: int = 255, cms_per_speed: float = 0.8,
+                 max_accel: float = 150.0, max_decel: float = 250.0,
+                 max_turn_rate: float = 360.0, corner_speed: float = 10.0,
+                 max_lateral_accel: float = 300.0, speed_table=None):
+        self.max_speed = max_speed          # Highest speed command (0-255)
+        self.cms_per_speed = cms_per_speed  # cm/s per speed unit
+        self.max_accel = max_accel          # cm/s^2
+        self.max_decel = max_decel          # cm/s^2
+        self.max_turn_rate = max_turn_rate  # deg/s when turning in place
+        self.corner_speed = corner_speed    # cm/s allowed through a 90° corner
+        self.max_lateral_accel = max_lateral_accel  # cm/s^2 grip limit on arcs
+        self.speed_table = speed_table      # Measured SpeedTable, replaces cms_per_speed
+
+    @property
+    def max_velocity(self) -> float:
+        return self.to_cms(self.max_speed)
+
+    def to_cms(self, speed: float) -> float:
+        """Speed command (0-255) to cm/s"""
+        if self.speed_table is not None:
+            return self.speed_table.to_cms(speed)
+        return speed * self.cms_per_speed
+
+    def to_speed(self, velocity: float) -> int:
+        """cm/s to the nearest speed command (0-255)"""
+        if self.speed_table is not None:
+            speed = self.speed_table.to_speed(velocity)
+        else:
+            speed = velocity / self.cms_per_speed
+        return max(0, min(self.max_speed, int(round(speed))))
+
+    def corner_limit(self, turn_angle: float, radius: Optional[float] = None) -> float:
+        """Highest speed (cm/s) at which a heading change of `turn_angle` degrees can be taken
+
+        With a `radius` (cm) the change is part of an arc, limited by grip
+        and by how fast the robot can turn.
+        """
+        turn_angle = abs(turn_angle)
+        if turn_angle < 1:
+            return self.max_velocity
+        if turn_angle >= TURN_THRESHOLD:
+            return self.corner_speed
+        if radius is not None:
+            grip = math.sqrt(self.max_lateral_accel * radius)
+            yaw_rate = radius * math.radians(self.max_turn_rate)
+            return min(self.max_velocity, grip, yaw_rate)
+        # Blend from full speed for tiny corrections down to corner speed at a full turn
+        blend = turn_angle / TURN_THRESHOLD
+        return self.max_velocity + (self.corner_speed - self.max_velocity) * blend
+
+
+class SegmentProfile:
+    """Time-parameterized speed profile for one waypoint-to-waypoint segment"""
+
+    def __init__(self, start: Waypoint, end: Waypoint, distance: float,
+                 v_entry: float = 0.0, v_peak: float = 0.0, v_exit: float = 0.0,
+                 accel: float = 1.0, decel: float = 1.0, turn_time: float = 0.0):
+        self.start = start
+        self.end = end
+        self.distance = distance
+        self.v_entry = v_entry
+        self.v_peak = v_peak
+        self.v_exit = v_exit
+        self.accel = accel
+        self.decel = decel
+        self.turn_time = turn_time  # Only for turn-in-place segments
+
+        self.t_accel = (v_peak - v_entry) / accel if distance > 0 else 0.0
+        self.t_decel = (v_peak - v_exit) / decel if distance > 0 else 0.0
+        self.d_accel = (v_entry + v_peak) / 2 * self.t_accel
+        self.d_decel = (v_peak + v_exit) / 2 * self.t_decel
+        d_cruise = max(0.0, distance - self.d_accel - self.d_decel)
+        self.t_cruise = d_cruise / v_peak if v_peak > 0 else 0.0
+
+    @property
+    def turn_in_place(self) -> bool:
+        return self.distance < 1
+
+    @property
+    def duration(self) -> float:
+        if self.turn_in_place:
+            return self.turn_time
+        return self.t_accel + self.t_cruise + self.t_decel
+
+    def speed_at(self, t: float) -> float:
+        """Planned velocity (cm/s) `t` seconds into the segment"""
+        if self.turn_in_place:
+            return 0.0
+        if t <= 0:
+            return self.v_entry
+        if t < self.t_accel:
+            return self.v_entry + self.accel * t
+        t -= self.t_accel
+        if t < self.t_cruise:
+            return self.v_peak
+        t -= self.t_cruise
+        if t < self.t_decel:
+            return self.v_peak - self.decel * t
+        return self.v_exit
+
+    def speed_at_distance(self, s: float) -> float:
+        """Planned velocity (cm/s) after `s` cm of the segment"""
+        if self.turn_in_place:
+            return 0.0
+        s = max(0.0, s)
+        if s < self.d_accel:
+            return math.sqrt(self.v_entry ** 2 + 2 * self.accel * s)
+        remaining = self.distance - s
+        if remaining < self.d_decel:
+            return math.sqrt(self.v_exit ** 2 + 2 * self.decel * max(0.0, remaining))
+        return self.v_peak
+
+
+def plan_speed_profile(waypoints: List[Waypoint], model: RobotModel,
+                       finish_speed: Optional[float] = None) -> List[SegmentProfile]:
+    """Plan one SegmentProfile per consecutive waypoint pair
+
+    Moving segments accelerate to the highest speed the model allows, cruise
+    and brake just in time to meet the corner limit of the next heading
+    change. Turn-in-place segments get the rotation time of the model.
+    The last segment crosses the finish at `finish_speed` (cm/s, default
+    full speed).
+    """
+    pairs = list(zip(waypoints[:-1], waypoints[1:]))
+    distances = [math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in pairs]
+    moving = [i for i, d in enumerate(distances) if d >= 1]
+    v_max = model.max_velocity
+
+    # Speed limit at the end of every moving segment: the heading change up to the next one
+    exit_limit = {}
+    for n, i in enumerate(moving):
+        if n + 1 < len(moving):
+            following = moving[n + 1]
+            turn = abs(shortest_turn(pairs[i][1][2], pairs[following][1][2]))
+            # Radius of the circle through the two chords' outer ends and the corner
+            # between them (the chords' own radius when they are equally long)
+            radius = None
+            if following == i + 1 and turn >= 1:
+                (ax, ay, _), (bx, by, _) = pairs[i][0], pairs[following][1]
+                radius = math.hypot(bx - ax, by - ay) / (2 * math.sin(math.radians(turn)))
+            exit_limit[i] = model.corner_limit(turn, radius)
+        else:
+            exit_limit[i] = v_max if finish_speed is None else min(v_max, finish_speed)
+
+    # Forward pass: how fast can we be going when each segment ends
+    entry = {}
+    v = 0.0
+    for i in moving:
+        entry[i] = v
+        v = min(exit_limit[i], math.sqrt(v * v + 2 * model.max_accel * distances[i]))
+        exit_limit[i] = v
+    # Backward pass: brake in time for every corner
+    for n in range(len(moving) - 1, -1, -1):
+        i = moving[n]
+        v_exit = exit_limit[i]
+        entry[i] = min(entry[i], math.sqrt(v_exit * v_exit + 2 * model.max_decel * distances[i]))
+        if n > 0:
+            previous = moving[n - 1]
+            exit_limit[previous] = min(exit_limit[previous], entry[i])
+
+    profiles = []
+    for i, (start, end) in enumerate(pairs):
+        d = distances[i]
+        if d < 1:
+            turn_time = abs(shortest_turn(start[2], end[2])) / model.max_turn_rate
+            profiles.append(SegmentProfile(start, end, d, turn_time=turn_time))
+            continue
+        v0, v1 = entry[i], exit_limit[i]
+        a, b = model.max_accel, model.max_decel
+        # Peak of the triangle profile, capped by the top speed
+        v_peak = math.sqrt((2 * a * b * d + b * v0 * v0 + a * v1 * v1) / (a + b))
+        v_peak = max(v0, v1, min(v_max, v_peak))
+        profiles.append(SegmentProfile(start, end, d, v0, v_peak, v1, a, b))
+    return profiles
+
+
+def lap_time(profiles: List[SegmentProfile]) -> float:
+    """Planned lap time in seconds"""
+    return sum(profile.duration for profile in profiles)
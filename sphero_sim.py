@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Simulated Sphero BOLT backend
+Drop-in stand-in for spherov2's SpheroEduAPI so SpheroRacer can race offline
+Kinematic model with acceleration limits, turn-rate limits and command latency
+"""
+
+import ast
+import math
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+from scheduler import DeadlineScheduler
+
+
+class VirtualClock:
+    """Simulated time that only moves when slept on, so a race runs as fast as the CPU allows
+
+    Single-threaded: the racer, the robot and the periodic timers (the
+    simulated sensor stream) all run on the thread that sleeps.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self._timers: List[List] = []  # [due, interval, callback]
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, duration: float):
+        """Advance the clock by `duration`, firing the timers due on the way"""
+        end = self.now + max(0.0, duration)
+        while self._timers:
+            timer = min(self._timers, key=lambda entry: entry[0])
+            if timer[0] > end:
+                break
+            self.now = max(self.now, timer[0])
+            timer[0] += timer[1]
+            timer[2]()
+        self.now = end
+
+    def every(self, interval: float, callback: Callable[[], None]) -> List:
+        """Call `callback` every `interval` seconds of simulated time; returns the timer"""
+        timer = [self.now + interval, interval, callback]
+        self._timers.append(timer)
+        return timer
+
+    def cancel(self, timer: List):
+        if timer in self._timers:
+            self._timers.remove(timer)
+
+
+class SimulatedSensorControl:
+    """Firmware sensor stream of the simulated robot, ticking on a VirtualClock"""
+
+    def __init__(self, api: "SimulatedSpheroEduAPI", clock: VirtualClock):
+        self.api = api
+        self.clock = clock
+        self.listeners: List[Callable[[Dict[str, Dict[str, float]]], None]] = []
+        self._timer = None
+        self.set_interval(150)
+
+    def add_sensor_data_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_sensor_data_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def set_interval(self, interval: int):
+        """Streaming interval in ms"""
+        if self._timer is not None:
+            self.clock.cancel(self._timer)
+        self._timer = self.clock.every(interval / 1000, self._emit)
+
+    def _emit(self):
+        if not self.listeners:
+            return
+        api = self.api
+        data = {'locator': api.get_location(), 'velocity': api.get_velocity(),
+                'gyroscope': api.get_gyroscope(), 'accelerometer': api.get_acceleration()}
+        for listener in list(self.listeners):
+            listener(data)
+
+
+class SimulatedSpheroEduAPI:
+    """Kinematic Sphero BOLT that answers the SpheroEduAPI calls used by SpheroRacer
+
+    Positions follow the BOLT locator: cm, y forward along the initial aim,
+    x to the right. Headings are degrees clockwise from the aim, like the
+    real API. Every command blocks for `command_latency` seconds (the BLE
+    round trip) and only reaches the motors once that time has passed.
+    On a VirtualClock the robot also streams its sensors like the firmware
+    does, as there is no real time for a polling thread to run in.
+
+    With a `corridor` (centre polyline in locator cm) the robot is kept
+    between walls `corridor_half_width` either side of it, stops dead when it
+    bumps into one and raises on_collision. `locator_drift` (deg/s) turns the
+    locator's idea of travel away from the true one, like the dead-reckoning
+    drift of the real robot, so a wall is the only way back to the truth.
+    """
+
+    STEP = 0.005  # Integration step (s)
+
+    def __init__(self, max_accel: float = 150.0, max_decel: float = 250.0,
+                 max_turn_rate: float = 360.0, command_latency: float = 0.03,
+                 cms_per_speed: float = 0.8, locator_noise: float = 0.0,
+                 corridor: Optional[List[Tuple[float, float]]] = None, corridor_half_width: float = 25.0,
+                 robot_radius: float = 3.65, locator_drift: float = 0.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        # Robot model
+        self.max_accel = max_accel            # cm/s^2 when speeding up
+        self.max_decel = max_decel            # cm/s^2 when braking
+        self.max_turn_rate = max_turn_rate    # deg/s
+        self.command_latency = command_latency  # s from call to motor response
+        self.cms_per_speed = cms_per_speed    # cm/s per speed unit (0-255)
+        self.locator_noise = locator_noise    # cm, std of the noise on every locator reading
+        self._random = random.Random(0)
+        self.corridor = corridor              # Locator cm, None for an open floor
+        self.corridor_half_width = corridor_half_width
+        self.robot_radius = robot_radius      # cm from the centre to the shell
+        self.locator_drift = locator_drift    # deg/s the locator's travel direction drifts
+        self.clock = clock
+        self.sleep = sleep
+
+        # Commanded state (what the API was told)
+        self._heading = 0
+        self._speed = 0
+        self._aim_offset = 0.0
+        self._led = None
+        self._pending: List[Tuple[float, float, float]] = []  # (effect time, yaw, cm/s)
+
+        # Physical state (what the robot is doing)
+        self._x = 0.0
+        self._y = 0.0
+        self._yaw = 0.0           # deg clockwise from locator y axis
+        self._velocity = 0.0      # cm/s along yaw
+        self._target_yaw = 0.0
+        self._target_velocity = 0.0
+        self._yaw_rate = 0.0      # deg/s, clockwise positive
+        self._accel = 0.0         # cm/s^2 along yaw
+        self._distance = 0.0
+        self._locator_x = 0.0     # Where the locator thinks the robot is
+        self._locator_y = 0.0
+        self._touching = False
+        self._events: List[str] = []  # Raised inside the lock, handled outside it
+        self._handlers: Dict[str, List[Callable]] = {}
+        self._last_update = self.clock()
+        self._start = self._last_update
+        self._lock = threading.Lock()
+        if isinstance(clock, VirtualClock):
+            self._SpheroEduAPI__toy = SimpleNamespace(sensor_control=SimulatedSensorControl(self, clock))
+
+    # --- Context manager (SpheroEduAPI is used as `with ... as api`) ---
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop_roll()
+        return False
+
+    # --- Physics ---
+
+    def _advance(self, now: float):
+        """Integrate the kinematic model up to `now`"""
+        t = self._last_update
+        while t < now:
+            dt = min(self.STEP, now - t)
+            t += dt
+            # Commands whose latency has elapsed reach the motors
+            while self._pending and self._pending[0][0] <= t:
+                _, self._target_yaw, self._target_velocity = self._pending.pop(0)
+
+            # Turn towards target yaw along the shortest way, rate limited
+            yaw_error = (self._target_yaw - self._yaw + 180) % 360 - 180
+            max_step = self.max_turn_rate * dt
+            yaw_step = max(-max_step, min(max_step, yaw_error))
+            self._yaw = (self._yaw + yaw_step) % 360
+            self._yaw_rate = yaw_step / dt
+
+            # Accelerate towards target speed, acceleration limited
+            dv = self._target_velocity - self._velocity
+            limit = (self.max_accel if dv > 0 else self.max_decel) * dt
+            dv = max(-limit, min(limit, dv))
+            self._velocity += dv
+            self._accel = dv / dt
+
+            rad = math.radians(self._yaw)
+            x, y = self._x, self._y
+            self._x += self._velocity * math.sin(rad) * dt
+            self._y += self._velocity * math.cos(rad) * dt
+            if self.corridor is not None:
+                self._keep_inside_walls()
+            self._distance += abs(self._velocity) * dt
+
+            # The locator integrates the true motion in a slowly turning frame
+            drift = math.radians(self.locator_drift * (t - self._start))
+            step_x, step_y = self._x - x, self._y - y
+            self._locator_x += step_x * math.cos(drift) + step_y * math.sin(drift)
+            self._locator_y += step_y * math.cos(drift) - step_x * math.sin(drift)
+        self._last_update = max(self._last_update, now)
+
+    def _keep_inside_walls(self):
+        """Push the robot back inside the corridor; a fresh bump stops it and raises on_collision
+
+        While it stays in contact (within a cm of a wall) it slides along the wall.
+        """
+        reach = self.corridor_half_width - self.robot_radius
+        depth, inside = -math.inf, None  # Deepest a straight has the robot, closest point inside one
+        for (ax, ay), (bx, by) in zip(self.corridor[:-1], self.corridor[1:]):
+            length = math.hypot(bx - ax, by - ay)
+            ux, uy = (bx - ax) / length, (by - ay) / length
+            along = (self._x - ax) * ux + (self._y - ay) * uy
+            across = (self._x - ax) * uy - (self._y - ay) * ux
+            segment_depth = min(reach - abs(across), along + reach, length + reach - along)
+            if segment_depth > depth:
+                along = max(-reach, min(length + reach, along))
+                across = max(-reach, min(reach, across))
+                depth, inside = segment_depth, (ax + along * ux + across * uy, ay + along * uy - across * ux)
+        if depth < 0:
+            self._x, self._y = inside
+            if not self._touching:
+                self._velocity = 0.0
+                self._events.append('on_collision')
+        self._touching = depth < (1.0 if self._touching else 0.0)
+
+    def _raise_events(self):
+        """Call the handlers of the events raised since the last call (outside the lock)"""
+        while self._events:
+            event = self._events.pop(0)
+            for handler in self._handlers.get(event, []):
+                handler(self)
+
+    def _send(self):
+        """Send the commanded heading and speed as one drive packet"""
+        with self._lock:
+            now = self.clock()
+            self._advance(now)
+            velocity = self._speed * self.cms_per_speed
+            yaw = (self._heading + self._aim_offset) % 360
+            if velocity < 0:
+                velocity, yaw = -velocity, (yaw + 180) % 360
+            self._pending.append((now + self.command_latency, yaw, velocity))
+        self._raise_events()
+        if self.command_latency > 0:
+            self.sleep(self.command_latency)
+
+    def _update(self):
+        with self._lock:
+            self._advance(self.clock())
+        self._raise_events()
+
+    # SpheroEduAPI keeps the commanded heading under this private name and sends
+    # it along with every speed change; mirror it so that behaviour carries over
+    _SpheroEduAPI__heading = property(
+        lambda self: self._heading,
+        lambda self, heading: setattr(self, '_heading', int(heading) % 360))
+
+    # --- Motion commands ---
+
+    def set_heading(self, heading: int):
+        self._heading = int(heading) % 360
+        self._send()
+
+    def set_speed(self, speed: int):
+        self._speed = max(-255, min(255, int(speed)))
+        self._send()
+
+    def roll(self, heading: int, speed: int, duration: float):
+        self._heading = int(heading) % 360
+        self._speed = max(-255, min(255, int(speed)))
+        self._send()
+        self.sleep(duration)
+        self.stop_roll()
+
+    def stop_roll(self, heading: Optional[int] = None):
+        if heading is not None:
+            self._heading = int(heading) % 360
+        self._speed = 0
+        self._send()
+
+    def reset_aim(self):
+        with self._lock:
+            self._advance(self.clock())
+            self._aim_offset = self._yaw
+            self._heading = 0
+            self._target_yaw = self._yaw
+
+    # --- Events ---
+
+    def register_event(self, event_type, handler: Callable):
+        """Call `handler(api)` when `event_type` (an EventType or its name) happens; only on_collision is raised"""
+        name = getattr(event_type, 'name', event_type)
+        self._handlers.setdefault(name, []).append(handler)
+
+    # --- LEDs ---
+
+    def set_main_led(self, color):
+        self._led = color
+        if self.command_latency > 0:
+            self.sleep(self.command_latency)
+
+    def get_main_led(self):
+        return self._led
+
+    # --- Sensors ---
+
+    def get_heading(self) -> int:
+        return self._heading
+
+    def get_speed(self) -> int:
+        return self._speed
+
+    def get_location(self) -> Dict[str, float]:
+        self._update()
+        if self.locator_noise:
+            return {'x': self._locator_x + self._random.gauss(0, self.locator_noise),
+                    'y': self._locator_y + self._random.gauss(0, self.locator_noise)}
+        return {'x': self._locator_x, 'y': self._locator_y}
+
+    def get_velocity(self) -> Dict[str, float]:
+        self._update()
+        rad = math.radians(self._yaw + self.locator_drift * (self._last_update - self._start))
+        return {'x': self._velocity * math.sin(rad), 'y': self._velocity * math.cos(rad)}
+
+    def get_distance(self) -> float:
+        self._update()
+        return self._distance
+
+    def get_orientation(self) -> Dict[str, float]:
+        self._update()
+        yaw = (self._yaw - self._aim_offset + 180) % 360 - 180
+        return {'pitch': 0.0, 'roll': 0.0, 'yaw': yaw}
+
+    def get_gyroscope(self) -> Dict[str, float]:
+        """Angular rate in deg/s; z is counter-clockwise positive like the BOLT IMU"""
+        self._update()
+        return {'x': 0.0, 'y': 0.0, 'z': -self._yaw_rate}
+
+    def get_acceleration(self) -> Dict[str, float]:
+        """Body-frame acceleration in g: y forward, x to the right"""
+        self._update()
+        lateral = self._velocity * math.radians(self._yaw_rate)
+        return {'x': lateral / 981.0, 'y': self._accel / 981.0, 'z': 1.0}
+
+
+def benchmark(laps: int = 1, settings: Optional[Dict[str, object]] = None,
+              realtime: bool = False, walls: bool = False, **model) -> List[float]:
+    """Run SpheroRacer.run_race against the simulator and return the lap times
+
+    `settings` overrides racer attributes (e.g. {'CLOSED_LOOP': True}),
+    the remaining keyword arguments configure the simulated robot. The
+    racer and the robot share one VirtualClock, so a lap takes only as long
+    as its computation; `realtime` (forced by PRIORITY_DISPATCH, whose
+    worker thread needs real time) races on the wall clock instead.
+    `walls` puts the panel corridor of the course around the robot.
+    """
+    from AutomaticCircuit import SpheroRacer
+    from course import COURSE_WAYPOINTS, centre_line
+
+    settings = settings or {}
+    if not realtime and settings.get('PRIORITY_DISPATCH'):
+        print("⏱️ PRIORITY_DISPATCH runs a worker thread: simulating in real time")
+        realtime = True
+
+    times = []
+    for lap in range(laps):
+        if realtime:
+            clock, sleep = time.perf_counter, time.sleep
+            scheduler = DeadlineScheduler()
+        else:
+            clock = VirtualClock()
+            sleep = clock.sleep
+            scheduler = DeadlineScheduler(clock, sleep, spin=0)
+        racer = SpheroRacer(toy_name="SIM", scheduler=scheduler)
+        for name, value in settings.items():
+            setattr(racer, name, value)
+        if walls:
+            # Course to locator frame: the robot starts on the first waypoint aimed along course +x
+            start_x, start_y = COURSE_WAYPOINTS[0][:2]
+            model.update(corridor=[(start_y - y, x - start_x) for x, y in centre_line(COURSE_WAYPOINTS)],
+                         corridor_half_width=racer.PANEL_SIZE / 2, robot_radius=racer.ROBOT_RADIUS)
+        with SimulatedSpheroEduAPI(clock=clock, sleep=sleep, **model) as api:
+            api.reset_aim()
+            racer.calibrated = True  # Simulated robot is always aimed at the first segment
+            start = clock()
+            if not racer.run_race(api):
+                print(f"❌ Simulated lap {lap+1} failed")
+                break
+            times.append(clock() - start)
+            location = api.get_location()
+            print(f"🏁 Simulated lap {lap+1}: {times[-1]:.2f}s, "
+                  f"ended at locator ({location['x']:.0f}, {location['y']:.0f})")
+    return times
+
+
+if __name__ == "__main__":
+    laps = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    # Racer settings as NAME=value, e.g. CLOSED_LOOP=True STRAIGHT_SPEED=120,
+    # lowercase names configure the robot, e.g. locator_drift=0.5;
+    # --realtime races on the wall clock instead of simulated time, --walls
+    # puts the course walls around the robot
+    overrides, robot = {}, {}
+    for arg in sys.argv[2:]:
+        if arg in ("--realtime", "--walls"):
+            continue
+        name, _, value = arg.partition("=")
+        (robot if name.islower() else overrides)[name] = ast.literal_eval(value)
+    lap_times = benchmark(laps, overrides, realtime="--realtime" in sys.argv[2:],
+                          walls="--walls" in sys.argv[2:], **robot)
+    if lap_times:
+        print(f"⏱️ Best simulated lap: {min(lap_times):.2f}s over {len(lap_times)} lap(s)")
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Post-race telemetry analytics
+Vectorized NumPy statistics over telemetry logs: cross-track error, per-segment
+speed and acceleration, corner entry/exit speeds and the gap to the best lap
+"""
+
+import json
+import sys
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from course import COURSE_WAYPOINTS, Point, Waypoint, centre_line, corners
+from telemetry_log import TelemetryLog, archive_paths
+
+CORNER_WINDOW = 25.0  # cm around a corner point where entry/exit speeds are taken
+
+
+def polyline_segments(path: List[Point]):
+    """Start points (M, 2), direction vectors (M, 2) and squared lengths (M,) of a polyline"""
+    points = np.asarray(path, dtype=np.float64)
+    starts = points[:-1]
+    vectors = points[1:] - starts
+    return starts, vectors, np.maximum((vectors ** 2).sum(axis=1), 1e-12)
+
+
+def cross_track_error(x: np.ndarray, y: np.ndarray, path: List[Point]) -> np.ndarray:
+    """Distance (cm) of every sample to the closest point of the polyline"""
+    starts, vectors, lengths = polyline_segments(path)
+    px = np.asarray(x, dtype=np.float64)[:, None] - starts[:, 0]  # (N, M)
+    py = np.asarray(y, dtype=np.float64)[:, None] - starts[:, 1]
+    t = np.clip((px * vectors[:, 0] + py * vectors[:, 1]) / lengths, 0.0, 1.0)
+    return np.hypot(px - t * vectors[:, 0], py - t * vectors[:, 1]).min(axis=1)
+
+
+def corner_points(waypoints: List[Waypoint]) -> np.ndarray:
+    """Centre-line vertices (C, 2) where the course turns"""
+    return np.asarray(corners(waypoints), dtype=np.float64).reshape(-1, 2)
+
+
+def speed_and_acceleration(log: TelemetryLog):
+    """Measured speed (cm/s) and its time derivative (cm/s^2) per sample"""
+    speed = np.hypot(log['vx'], log['vy']).astype(np.float64)
+    if len(speed) < 2:
+        return speed, np.zeros_like(speed)
+    return speed, np.gradient(speed, log['t'])
+
+
+def segment_bounds(log: TelemetryLog) -> np.ndarray:
+    """First record of every indexed segment plus the end of the log"""
+    firsts = log.segments['first'].astype(np.int64)
+    return np.append(firsts, len(log))
+
+
+def segment_stats(log: TelemetryLog, speed: np.ndarray, acceleration: np.ndarray,
+                  error: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-segment duration, speed, acceleration and cross-track error (reduceat, no loop)"""
+    bounds = segment_bounds(log)
+    starts = np.minimum(bounds[:-1], max(len(log) - 1, 0))
+    counts = np.diff(bounds)
+    filled = counts > 0
+    t = log['t'].astype(np.float64)
+    segment_t = log.segments['t']
+    end_t = np.append(segment_t[1:], t[-1] if len(t) else 0.0)
+
+    def reduce(ufunc, values):
+        result = ufunc.reduceat(values, starts) if len(values) else np.zeros(len(starts))
+        return np.where(filled, result, np.nan)
+
+    return {
+        'index': log.segments['index'].astype(np.int64),
+        'kind': log.segments['kind'].astype(np.int64),
+        'duration': end_t - segment_t,
+        'mean_speed': reduce(np.add, speed) / np.maximum(counts, 1),
+        'max_speed': reduce(np.maximum, speed),
+        'max_accel': reduce(np.maximum, acceleration),
+        'max_decel': -reduce(np.minimum, acceleration),
+        'mean_error': reduce(np.add, error) / np.maximum(counts, 1),
+        'max_error': reduce(np.maximum, error),
+    }
+
+
+def segment_profile(log: TelemetryLog, number: int) -> Dict[str, np.ndarray]:
+    """Speed and acceleration against time and distance travelled within one segment"""
+    speed, acceleration = speed_and_acceleration(log)
+    bounds = segment_bounds(log)
+    part = slice(bounds[number], bounds[number + 1])
+    records = log.records[part]
+    distance = np.concatenate(([0.0], np.cumsum(np.hypot(np.diff(records['x']), np.diff(records['y'])))))
+    return {'t': records['t'] - records['t'][:1], 'distance': distance,
+            'speed': speed[part], 'acceleration': acceleration[part]}
+
+
+def corner_speeds(x: np.ndarray, y: np.ndarray, speed: np.ndarray, corners: np.ndarray,
+                  window: float = CORNER_WINDOW) -> Dict[str, np.ndarray]:
+    """Speed entering, at the apex of and leaving the window around every corner
+
+    Corners the robot never came within `window` of are NaN.
+    """
+    distance = np.hypot(np.asarray(x, dtype=np.float64)[:, None] - corners[:, 0],
+                        np.asarray(y, dtype=np.float64)[:, None] - corners[:, 1])  # (N, C)
+    inside = distance <= window
+    reached = inside.any(axis=0)
+    entry = inside.argmax(axis=0)
+    leave = len(x) - 1 - inside[::-1].argmax(axis=0)
+    apex = distance.argmin(axis=0)
+    nan = np.full(len(corners), np.nan)
+    return {
+        'entry': np.where(reached, speed[entry], nan) if len(x) else nan,
+        'apex': np.where(reached, speed[apex], nan) if len(x) else nan,
+        'exit': np.where(reached, speed[leave], nan) if len(x) else nan,
+        'min_distance': distance.min(axis=0) if len(x) else nan,
+    }
+
+
+def analyze_lap(log: TelemetryLog, path: List[Point], corners: np.ndarray) -> Dict[str, object]:
+    """Summary of one lap; holds no references into the memory map"""
+    x, y = log['x'], log['y']
+    speed, acceleration = speed_and_acceleration(log)
+    error = cross_track_error(x, y, path)
+    return {
+        'path': log.path,
+        'started': log.started,
+        'lap_time': log.duration(),
+        'distance': float(np.hypot(np.diff(x), np.diff(y)).sum()),
+        'mean_error': float(error.mean()) if len(error) else 0.0,
+        'max_error': float(error.max()) if len(error) else 0.0,
+        'max_speed': float(speed.max()) if len(speed) else 0.0,
+        'segments': segment_stats(log, speed, acceleration, error),
+        'corners': corner_speeds(x, y, speed, corners),
+    }
+
+
+def analyze_archive(paths: Iterable[str], waypoints: List[Waypoint]) -> List[Dict[str, object]]:
+    """Analyze laps one file at a time (memory stays flat) and add the gap to the best lap
+
+    `gap` is the lap time minus the best one; `segment_gap` the per-segment
+    time difference to the best lap where both laps have the same segments.
+    """
+    path = centre_line(waypoints)
+    corners = corner_points(waypoints)
+    laps = []
+    for file in paths:
+        with TelemetryLog(file) as log:
+            if len(log):
+                laps.append(analyze_lap(log, path, corners))
+    if not laps:
+        return laps
+
+    times = np.array([lap['lap_time'] for lap in laps])
+    best = laps[int(times.argmin())]
+    for lap, gap in zip(laps, times - times.min()):
+        lap['gap'] = float(gap)
+        same = len(lap['segments']['duration']) == len(best['segments']['duration'])
+        lap['segment_gap'] = (lap['segments']['duration'] - best['segments']['duration']
+                              if same else None)
+    return laps
+
+
+def report(laps: List[Dict[str, object]]) -> Dict[str, object]:
+    """JSON-ready nightly report over analyzed laps"""
+    if not laps:
+        return {'laps': 0}
+    times = np.array([lap['lap_time'] for lap in laps])
+    errors = np.array([lap['mean_error'] for lap in laps])
+    entry = np.vstack([lap['corners']['entry'] for lap in laps])
+    exit_ = np.vstack([lap['corners']['exit'] for lap in laps])
+    best = laps[int(times.argmin())]
+    return {
+        'laps': len(laps),
+        'best': {'path': best['path'], 'lap_time': float(times.min())},
+        'lap_time': {'mean': float(times.mean()), 'median': float(np.median(times)),
+                     'p95': float(np.percentile(times, 95))},
+        'mean_cross_track_error': float(errors.mean()),
+        'corner_entry_speed': np.nanmean(entry, axis=0).tolist() if entry.size else [],
+        'corner_exit_speed': np.nanmean(exit_, axis=0).tolist() if exit_.size else [],
+        'gaps': [{'path': lap['path'], 'gap': lap['gap']} for lap in laps],
+    }
+
+
+def print_report(summary: Dict[str, object]):
+    if not summary['laps']:
+        print("📭 No telemetry laps found")
+        return
+    print(f"📊 {summary['laps']} laps analyzed")
+    print(f"🏆 Best lap: {summary['best']['lap_time']:.2f}s ({summary['best']['path']})")
+    times = summary['lap_time']
+    print(f"⏱️ Lap time: mean {times['mean']:.2f}s, median {times['median']:.2f}s, p95 {times['p95']:.2f}s")
+    print(f"📐 Mean cross-track error: {summary['mean_cross_track_error']:.1f} cm")
+    print("🔄 Corner speeds (cm/s, entry → exit):")
+    for i, (entry, exit_) in enumerate(zip(summary['corner_entry_speed'], summary['corner_exit_speed'])):
+        print(f"   corner {i+1:<2} {entry:6.1f} → {exit_:6.1f}")
+
+
+def main(archive: str, output: Optional[str] = None):
+    summary = report(analyze_archive(archive_paths(archive), COURSE_WAYPOINTS))
+    print_report(summary)
+    if output:
+        with open(output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"📝 Report written to {output}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} <telemetry dir or glob> [report.json]")
+        sys.exit(1)
+    main(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
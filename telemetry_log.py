@@ -0,0 +1,137 @@
+"""
+Binary telemetry log
+One fixed-size record per sensor sample plus an index of segment boundaries,
+written during the race and memory-mapped as NumPy views for analysis
+"""
+
+import glob
+import mmap
+import os
+import struct
+import time
+from typing import List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # Writing works without NumPy, reading needs it
+    np = None
+
+MAGIC = b"SPHTLM\x00\x01"
+VERSION = 1
+
+# magic, version, record size, segment size, record count, segment count, start (epoch s)
+HEADER = struct.Struct("<8sHHH2xQQd")
+# t (s since race start), course x, y (cm), commanded heading (deg) and speed,
+# course velocity x, y (cm/s), gyroscope z (deg/s, counter-clockwise)
+RECORD = struct.Struct("<d7f")
+# segment number, kind, first record, start t (s since race start)
+SEGMENT = struct.Struct("<IIQd")
+
+RECORD_FIELDS = ("t", "x", "y", "heading", "speed", "vx", "vy", "gyro_z")
+SEGMENT_KINDS = ("moving", "turning")
+
+if np is not None:
+    RECORD_DTYPE = np.dtype([("t", "<f8")] + [(name, "<f4") for name in RECORD_FIELDS[1:]])
+    SEGMENT_DTYPE = np.dtype([("index", "<u4"), ("kind", "<u4"), ("first", "<u8"), ("t", "<f8")])
+
+
+class TelemetryWriter:
+    """Appends records to a telemetry file; the segment index and counts are written on close"""
+
+    def __init__(self, path: str, started: Optional[float] = None):
+        self.path = path
+        self.started = time.time() if started is None else started
+        self.records = 0
+        self.segments: List[bytes] = []
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, SEGMENT.size, 0, 0, self.started))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def write(self, t: float, x: float, y: float, heading: float, speed: float,
+              vx: float, vy: float, gyro_z: float):
+        self._file.write(RECORD.pack(t, x, y, heading, speed, vx, vy, gyro_z))
+        self.records += 1
+
+    def mark_segment(self, index: int, kind: str, t: float):
+        """Start a segment at the next record"""
+        self.segments.append(SEGMENT.pack(index, SEGMENT_KINDS.index(kind), self.records, t))
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.write(b"".join(self.segments))
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, SEGMENT.size,
+                                     self.records, len(self.segments), self.started))
+        self._file.close()
+
+
+class TelemetryLog:
+    """Memory-mapped telemetry file; `records` and `segments` are zero-copy NumPy views
+
+    Fields are available as `log['x']` etc. Drop all views before close().
+    """
+
+    def __init__(self, path: str):
+        if np is None:
+            raise ImportError("Reading telemetry logs needs NumPy")
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, segment_size, count, segments, self.started = \
+            HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} telemetry log")
+        if record_size != RECORD_DTYPE.itemsize or segment_size != SEGMENT_DTYPE.itemsize:
+            self.close()
+            raise ValueError(f"{path} has unexpected record sizes")
+        self.records = np.frombuffer(self._map, RECORD_DTYPE, count, HEADER.size)
+        self.segments = np.frombuffer(self._map, SEGMENT_DTYPE, segments,
+                                      HEADER.size + count * record_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, field: str):
+        return self.records[field]
+
+    def segment(self, number: int):
+        """Records of the `number`-th entry of the segment index (a view)"""
+        first = int(self.segments["first"][number])
+        end = int(self.segments["first"][number + 1]) if number + 1 < len(self.segments) else len(self)
+        return self.records[first:end]
+
+    def duration(self) -> float:
+        return float(self.records["t"][-1] - self.records["t"][0]) if len(self) else 0.0
+
+    def close(self):
+        self.records = self.segments = None
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+
+def archive_paths(pattern: str) -> List[str]:
+    """Telemetry files matching a glob pattern (or in a directory), oldest first"""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.tlm")
+    return sorted(glob.glob(pattern), key=os.path.getmtime)
+
+
+def load_archive(pattern: str) -> List[TelemetryLog]:
+    """Memory-map every telemetry file matching a glob pattern (or in a directory)"""
+    return [TelemetryLog(path) for path in archive_paths(pattern)]
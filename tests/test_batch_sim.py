@@ -0,0 +1,36 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("spherov2")  # sphero_sim races the real SpheroRacer
+
+from batch_sim import simulate_batch
+from cornering import build_cornering_path
+from course import COURSE_WAYPOINTS
+from sphero_sim import benchmark
+
+
+@pytest.mark.parametrize("settings", [
+    {},
+    {'CLOSED_LOOP': True},
+    {'CONTINUOUS_MOTION': True},
+    {'CORNERING_ARCS': True},
+    {'CORNERING_ARCS': True, 'CLOSED_LOOP': True},
+], ids=lambda settings: "-".join(settings) or "timed")
+def test_batch_lap_times_match_the_racer_on_the_simulated_robot(settings):
+    config = {name: value for name, value in settings.items() if name != 'CORNERING_ARCS'}
+    if settings.get('CORNERING_ARCS'):
+        config['waypoints'] = build_cornering_path(COURSE_WAYPOINTS, 25, 15)  # The racer's defaults
+    batch = simulate_batch([config], dt=0.005)['lap_time'][0]
+    lap, = benchmark(1, dict(settings))
+    assert not math.isnan(batch)
+    assert batch == pytest.approx(lap, abs=0.1)
+
+
+def test_robots_in_one_batch_do_not_affect_each_other():
+    configs = [{'STRAIGHT_SPEED': speed} for speed in (60, 80, 100)]
+    together = simulate_batch(configs)['lap_time']
+    alone = [simulate_batch([config])['lap_time'][0] for config in configs]
+    assert np.allclose(together, alone)
+    assert together[0] > together[1] > together[2]
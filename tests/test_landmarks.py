@@ -0,0 +1,43 @@
+import pytest
+
+from course import COURSE_WAYPOINTS
+from landmarks import LandmarkAnchor
+
+CONTACT = 25.0 - 3.65  # Robot centre to centre line when touching a wall
+
+
+@pytest.fixture
+def anchor():
+    return LandmarkAnchor(COURSE_WAYPOINTS, half_width=25.0, robot_radius=3.65, radius=15.0)
+
+
+def test_bump_on_a_straight_only_fixes_the_axis_across_the_wall(anchor):
+    # First straight runs along y = 250 towards +x; heading 90 drives towards smaller y
+    dx, dy = anchor.correction(300.0, 250.0 - CONTACT + 6.0, "collision", heading=90)
+    assert dx is None
+    assert dy == pytest.approx(-6.0)
+    assert anchor.max_correction() == pytest.approx(6.0)
+
+
+def test_wall_behind_the_robot_does_not_match(anchor):
+    # Closer to the wall at larger y, but driving away from it
+    assert anchor.correction(300.0, 250.0 + CONTACT - 2.0, "collision", heading=90) is None
+    assert anchor.corrections == []
+
+
+def test_estimate_far_from_any_wall_does_not_match(anchor):
+    assert anchor.correction(300.0, 250.0, "collision") is None
+
+
+def test_bump_into_the_outer_wall_of_a_corner(anchor):
+    # Overshooting the corner at (450, 250) along +x hits the wall at x = 475
+    dx, dy = anchor.correction(450.0 + CONTACT - 4.0, 245.0, "collision", heading=0)
+    assert dx == pytest.approx(4.0)
+    assert dy is None
+
+
+def test_side_lines_opening_into_a_corner_panel_are_no_wall(anchor):
+    # Past x = 450 the first straight's side line y = 225 crosses the corner
+    # panel, which is open towards the second straight
+    assert anchor.open_floor(460.0, 250.0 - 25.0)
+    assert not anchor.open_floor(300.0, 250.0 - 25.0)
@@ -0,0 +1,59 @@
+import pytest
+
+from lap_learning import ROLLING, STANDING, LapLearner, end_point_error
+
+
+def test_end_point_error_is_along_and_right_of_travel():
+    # Travelling +x; course y grows to the left of travel (headings are clockwise)
+    along, cross = end_point_error((0.0, 0.0), (100.0, 0.0), (103.0, -2.0))
+    assert along == pytest.approx(3.0)
+    assert cross == pytest.approx(2.0)
+
+
+def test_speeds_rise_on_clean_laps_and_fall_back_after_a_slower_one():
+    learner = LapLearner(2, speed_step=10.0)
+    learner.begin_lap(ROLLING)
+    learner.observe(0, 2.0, 1.0)
+    learner.end_lap(20.0)
+    assert learner.speed == [10.0, 0.0]
+    learner.begin_lap(ROLLING)
+    learner.observe(0, 1.0, 1.0)
+    learner.end_lap(21.0)  # Slower: back to the best lap's speeds with half the step
+    assert learner.speed == [5.0, 0.0]
+    assert learner.speed_step == 5.0
+
+
+def test_standing_laps_are_not_compared_with_rolling_ones():
+    learner = LapLearner(2, speed_step=10.0)
+    learner.lap_times[ROLLING] = [20.0]  # From an earlier session
+    learner.begin_lap(STANDING)
+    learner.end_lap(24.0)  # Slower than the rolling best, but the first standing lap
+    assert learner.speed_step == 10.0
+    assert learner.best_time(STANDING) == 24.0
+    assert learner.best_time(ROLLING) == 20.0
+
+
+def test_first_segment_learns_its_distance_per_start():
+    learner = LapLearner(2, distance_gain=0.5)
+    learner.begin_lap(STANDING)
+    learner.observe(0, 10.0, 0.0)
+    learner.observe(1, 4.0, 0.0)
+    learner.end_lap(24.0)
+    learner.begin_lap(ROLLING)
+    assert learner.distance == [0.0, -2.0]
+    learner.observe(0, -6.0, 0.0)
+    learner.end_lap(20.0)
+    learner.begin_lap(STANDING)
+    assert learner.distance[0] == -5.0
+    assert learner.start_distance == {STANDING: -5.0, ROLLING: 3.0}
+
+
+def test_stored_corrections_round_trip():
+    learner = LapLearner(3)
+    learner.begin_lap(STANDING)
+    learner.observe(0, 8.0, 0.0)
+    learner.end_lap(24.0)
+    restored = LapLearner(3)
+    assert restored.load(learner.to_dict())
+    assert restored.to_dict() == learner.to_dict()
+    assert not LapLearner(4).load(learner.to_dict())
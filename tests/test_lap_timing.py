@@ -0,0 +1,62 @@
+import pytest
+
+from course import COURSE_WAYPOINTS, chain_laps
+from lap_timing import LapTimer
+
+
+def test_chain_laps_drives_through_the_finish_line():
+    path = chain_laps(COURSE_WAYPOINTS, 3)
+    # The finish straight (50,250)->(250,250) runs on into (250,250)->(450,250)
+    assert (250, 250, 0) not in path[1:-1]
+    assert path[0] == COURSE_WAYPOINTS[0] and path[-1] == COURSE_WAYPOINTS[-1]
+    assert len(path) == len(COURSE_WAYPOINTS) + 2 * (len(COURSE_WAYPOINTS) - 2)
+
+
+def test_chain_laps_keeps_a_finish_that_is_not_straight_on():
+    waypoints = [(0, 0, 0), (100, 0, 0), (100, 0, 90), (100, 100, 90), (0, 100, 180), (0, 100, 270), (0, 0, 270)]
+    path = chain_laps(waypoints, 2)
+    assert path == waypoints + waypoints[1:]
+
+
+def drive(timer, samples):
+    """Feed (t, x) samples along y = 0; returns the completed lap times"""
+    laps = []
+    for t, x in samples:
+        lap = timer.update(t, x, 0.0)
+        if lap is not None:
+            laps.append(lap)
+    return laps
+
+
+def test_standing_start_laps_are_timed_on_interpolated_crossings():
+    timer = LapTimer((0.0, 0.0), 0, half_width=25)
+    timer.start(0.0, 5.0, 0.0)  # Past the line: the clock starts now
+    assert not timer.rolling
+    laps = drive(timer, [(1.0, 50.0), (2.0, -50.0), (3.0, -10.0), (4.0, 10.0),
+                         (5.0, -30.0), (6.0, -5.0), (7.0, 15.0)])
+    assert laps == pytest.approx([3.5, 2.75])
+    assert timer.best_lap() == (2, pytest.approx(2.75))
+    assert timer.new_laps() == [(1, pytest.approx(3.5)), (2, pytest.approx(2.75))]
+    assert timer.new_laps() == []
+
+
+def test_rolling_start_begins_at_the_first_crossing():
+    timer = LapTimer((0.0, 0.0), 0, half_width=25)
+    timer.start(0.0, -5.0, 0.0)  # Just behind the line, inside the gate
+    assert timer.rolling
+    laps = drive(timer, [(0.5, 5.0), (2.0, 100.0), (4.0, -20.0), (4.5, 20.0)])
+    # Started crossing at 0.25s, lap done crossing at 4.25s
+    assert laps == pytest.approx([4.0])
+
+
+def test_jitter_on_the_line_does_not_count_a_lap():
+    timer = LapTimer((0.0, 0.0), 0, half_width=25, rearm=10)
+    timer.start(0.0, 1.0, 0.0)
+    assert drive(timer, [(0.1, -2.0), (0.2, 2.0), (0.3, -3.0), (0.4, 3.0)]) == []
+
+
+def test_crossings_outside_the_gate_are_ignored():
+    timer = LapTimer((0.0, 0.0), 0, half_width=25)
+    timer.start(0.0, 1.0, 0.0)
+    timer.update(1.0, -20.0, 40.0)
+    assert timer.update(2.0, 20.0, 40.0) is None
@@ -0,0 +1,84 @@
+import math
+
+import pytest
+
+from pose_filter import BIAS, V, X, Y, YAW, PoseEstimator, velocity_model
+
+
+def transition(state, dt, yaw_rate, acceleration):
+    """One noise-free prediction step from `state`"""
+    pose = PoseEstimator()
+    pose.state = list(state)
+    pose.predict(dt, yaw_rate, acceleration)
+    return pose.state
+
+
+def numeric_jacobian(f, state, eps=1e-6):
+    columns = []
+    for j in range(len(state)):
+        high, low = list(state), list(state)
+        high[j] += eps
+        low[j] -= eps
+        columns.append([(a - b) / (2 * eps) for a, b in zip(f(high), f(low))])
+    return [list(row) for row in zip(*columns)]
+
+
+STATE = [120.0, 80.0, math.radians(30), 45.0, 0.01]
+
+
+def test_predict_propagates_covariance_with_the_motion_jacobian():
+    dt, yaw_rate, acceleration = 0.05, 0.8, 60.0
+    pose = PoseEstimator(velocity_noise=0.0, gyro_noise=0.0, accel_noise=0.0, bias_noise=0.0)
+    pose.state = list(STATE)
+    pose.covariance = [[1.0 if i == j else 0.0 for j in range(5)] for i in range(5)]
+    pose.predict(dt, yaw_rate, acceleration)
+
+    f = numeric_jacobian(lambda state: transition(state, dt, yaw_rate, acceleration), STATE)
+    expected = [[sum(f[i][k] * f[j][k] for k in range(5)) for j in range(5)] for i in range(5)]
+    for i in range(5):
+        for j in range(5):
+            assert pose.covariance[i][j] == pytest.approx(expected[i][j], abs=1e-6)
+
+
+def test_velocity_measurement_jacobian_matches_finite_differences():
+    _, h = velocity_model(STATE)
+    numeric = numeric_jacobian(lambda state: velocity_model(state)[0], STATE)
+    for row, numeric_row in zip(h, numeric):
+        assert row == pytest.approx(numeric_row, abs=1e-6)
+
+
+def test_velocity_correction_turns_the_heading_towards_the_measurement():
+    pose = PoseEstimator()
+    pose.reset(0.0, 0.0, 0.0)
+    pose.state[V] = 50.0
+    pose.covariance[YAW][YAW] = math.radians(20) ** 2
+    # Moving along heading 10° (clockwise from +x, so course y decreases)
+    measured = (50 * math.cos(math.radians(10)), -50 * math.sin(math.radians(10)))
+    for t in range(5):
+        pose.update(t * 0.1, (0.0, 0.0), measured, 0.0, 0.0)
+        pose.state[X] = pose.state[Y] = 0.0
+    assert pose.heading() == pytest.approx(10, abs=1)
+    assert pose.state[BIAS] == pytest.approx(0, abs=0.05)
+
+
+def test_heading_fix_leaves_the_position_alone():
+    pose = PoseEstimator()
+    pose.reset(10.0, 20.0, 0.0)
+    pose.predict(0.5, 0.3, 0.0)
+    covariance_xx = pose.covariance[X][X]
+    pose.fix_heading(90)
+    assert pose.position() == (10.0, 20.0)
+    assert pose.heading() == pytest.approx(90)
+    assert pose.covariance[X][X] == covariance_xx
+    assert all(pose.covariance[YAW][j] == 0 for j in range(5) if j != YAW)
+
+
+def test_position_fix_only_moves_the_measured_axis():
+    pose = PoseEstimator()
+    pose.reset(10.0, 20.0, 0.0)
+    pose.predict(1.0, 0.0, 0.0)
+    covariance_yy = pose.covariance[Y][Y]
+    pose.shift(dx=-3.0)
+    assert pose.position() == (7.0, 20.0)
+    assert pose.covariance[X][X] == pose.locator_noise ** 2
+    assert pose.covariance[Y][Y] == covariance_yy
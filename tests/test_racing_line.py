@@ -0,0 +1,58 @@
+import math
+
+import pytest
+
+from cornering import build_cornering_path
+from course import COURSE_WAYPOINTS, centre_line, path_length
+from racing_line import line_gain, optimize_racing_line
+from speed_profile import RobotModel, lap_time, plan_speed_profile
+
+HALF_WIDTH = 20.0
+MODEL = RobotModel()
+
+
+@pytest.fixture(scope="module")
+def arcs():
+    return build_cornering_path(COURSE_WAYPOINTS, 25, 15)
+
+
+@pytest.fixture(scope="module")
+def line(arcs):
+    return optimize_racing_line(COURSE_WAYPOINTS, HALF_WIDTH, model=MODEL, baseline=arcs)
+
+
+def distance_to_centre(point, centre):
+    best = math.inf
+    for (ax, ay), (bx, by) in zip(centre[:-1], centre[1:]):
+        length_sq = (bx - ax) ** 2 + (by - ay) ** 2
+        t = max(0.0, min(1.0, ((point[0] - ax) * (bx - ax) + (point[1] - ay) * (by - ay)) / length_sq))
+        best = min(best, math.hypot(point[0] - ax - t * (bx - ax), point[1] - ay - t * (by - ay)))
+    return best
+
+
+def test_line_starts_and_finishes_on_the_course(line):
+    assert line[0][:2] == pytest.approx(COURSE_WAYPOINTS[0][:2])
+    assert line[-1][:2] == pytest.approx(COURSE_WAYPOINTS[-1][:2])
+
+
+def test_line_stays_in_the_corridor_and_is_no_longer_than_the_centre_line(line):
+    centre = centre_line(COURSE_WAYPOINTS)
+    assert all(distance_to_centre(point, centre) <= HALF_WIDTH * math.sqrt(2) + 1e-6 for point in line)
+    assert path_length(centre_line(line)) <= path_length(centre) + 1e-6
+    assert line_gain(COURSE_WAYPOINTS, line) >= 0
+
+
+def test_line_plans_faster_than_the_cornering_arcs(line, arcs):
+    assert line is not arcs
+    assert lap_time(plan_speed_profile(line, MODEL)) < lap_time(plan_speed_profile(arcs, MODEL))
+
+
+def test_racer_laps_the_line_faster_than_the_arcs():
+    pytest.importorskip("spherov2")
+    from sphero_sim import benchmark
+
+    for mode in ({}, {'CLOSED_LOOP': True}):
+        line_lap, = benchmark(1, dict(mode, RACING_LINE=True))
+        arcs_lap, = benchmark(1, dict(mode, CORNERING_ARCS=True, SPEED_PROFILE=True))
+        centre_lap, = benchmark(1, dict(mode))
+        assert line_lap < arcs_lap < centre_lap
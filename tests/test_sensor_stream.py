@@ -0,0 +1,42 @@
+from sensor_stream import SensorRing
+
+
+def ring(capacity, samples):
+    buffer = SensorRing(capacity, fields=("t", "x"))
+    for n in range(samples):
+        buffer.append((float(n), 10.0 * n))
+    return buffer
+
+
+def test_since_returns_new_samples_in_order_across_the_wrap():
+    buffer = ring(4, 3)
+    rows, cursor = buffer.since(0)
+    assert [row[0] for row in rows] == [0, 1, 2]
+    for n in range(3, 6):  # Wraps: slots 3, 0, 1
+        buffer.append((float(n), 10.0 * n))
+    rows, cursor = buffer.since(cursor)
+    assert [row[0] for row in rows] == [3, 4, 5]
+    assert cursor == 6
+    assert buffer.since(cursor) == ([], 6)
+
+
+def test_a_reader_that_fell_behind_gets_only_the_newest_capacity():
+    buffer = ring(4, 11)
+    rows, cursor = buffer.since(2)
+    assert [row[0] for row in rows] == [7, 8, 9, 10]
+    assert cursor == 11
+
+
+def test_latest_and_column_after_wrapping():
+    buffer = ring(4, 6)
+    assert len(buffer) == 4
+    assert buffer.latest() == {"t": 5.0, "x": 50.0}
+    assert list(buffer.column("x")) == [20.0, 30.0, 40.0, 50.0]
+    assert list(buffer.column("t", 2)) == [4.0, 5.0]
+
+
+def test_empty_ring():
+    buffer = SensorRing(4)
+    assert buffer.latest() is None
+    assert buffer.since(0) == ([], 0)
+    assert len(buffer.column("x")) == 0
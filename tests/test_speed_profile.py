@@ -0,0 +1,54 @@
+import math
+
+import pytest
+
+from course import COURSE_WAYPOINTS
+from speed_profile import RobotModel, lap_time, plan_speed_profile
+
+MODEL = RobotModel()
+
+
+def moving(profiles):
+    return [profile for profile in profiles if not profile.turn_in_place]
+
+
+def test_profiles_join_up_and_respect_the_limits():
+    profiles = moving(plan_speed_profile(COURSE_WAYPOINTS, MODEL))
+    assert profiles[0].v_entry == 0
+    for profile, following in zip(profiles[:-1], profiles[1:]):
+        assert profile.v_exit == pytest.approx(following.v_entry)
+    for profile in profiles:
+        assert profile.v_peak <= MODEL.max_velocity + 1e-9
+        # Reachable from the entry speed and able to brake to the exit speed over the segment
+        assert profile.d_accel + profile.d_decel <= profile.distance + 1e-6
+        assert profile.speed_at(profile.duration) == pytest.approx(profile.v_exit)
+
+
+def test_backward_pass_brakes_for_a_90_degree_corner():
+    waypoints = [(0, 0, 0), (300, 0, 0), (300, 0, 90), (300, 100, 90)]
+    first = plan_speed_profile(waypoints, MODEL)[0]
+    assert first.v_exit == pytest.approx(MODEL.corner_speed)
+    assert first.speed_at_distance(first.distance) == pytest.approx(MODEL.corner_speed)
+
+
+def test_forward_pass_limits_a_short_first_segment():
+    waypoints = [(0, 0, 0), (20, 0, 0), (300, 0, 0)]
+    first = plan_speed_profile(waypoints, MODEL)[0]
+    assert first.v_exit == pytest.approx(math.sqrt(2 * MODEL.max_accel * 20))
+
+
+def test_arc_corner_limit_uses_the_circle_through_both_chords():
+    # Two 10cm chords turning 15° lie on a circle of radius 10 / (2 sin 7.5°), not 10
+    turn = math.radians(15)
+    waypoints = [(0, 0, 0), (10, 0, 0), (10 + 10 * math.cos(turn), -10 * math.sin(turn), 15)]
+    model = RobotModel(max_lateral_accel=20.0)  # Grip, not the short run-up, sets the corner speed
+    first = plan_speed_profile(waypoints, model)[0]
+    radius = 10 / (2 * math.sin(turn / 2))
+    assert first.v_exit == pytest.approx(math.sqrt(model.max_lateral_accel * radius))
+
+
+def test_turns_in_place_take_the_rotation_time():
+    profiles = plan_speed_profile(COURSE_WAYPOINTS, MODEL)
+    turns = [profile for profile in profiles if profile.turn_in_place]
+    assert turns and all(profile.duration == pytest.approx(90 / MODEL.max_turn_rate) for profile in turns)
+    assert lap_time(profiles) == pytest.approx(sum(profile.duration for profile in profiles))
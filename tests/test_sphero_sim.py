@@ -0,0 +1,77 @@
+import pytest
+
+from sphero_sim import SimulatedSpheroEduAPI, VirtualClock
+
+
+def robot(**model):
+    clock = VirtualClock()
+    return clock, SimulatedSpheroEduAPI(clock=clock, sleep=clock.sleep, **model)
+
+
+def test_virtual_clock_fires_timers_in_order_while_sleeping():
+    clock = VirtualClock()
+    fired = []
+    clock.every(0.3, lambda: fired.append(("slow", clock())))
+    fast = clock.every(0.2, lambda: fired.append(("fast", clock())))
+    clock.sleep(0.5)
+    assert clock() == pytest.approx(0.5)
+    assert [name for name, _ in fired] == ["fast", "slow", "fast"]
+    assert [t for _, t in fired] == pytest.approx([0.2, 0.3, 0.4])
+    clock.cancel(fast)
+    clock.sleep(0.3)
+    assert [name for name, _ in fired[3:]] == ["slow"]
+
+
+def test_robot_accelerates_at_the_limit_after_the_command_latency():
+    clock, api = robot(max_accel=150.0, command_latency=0.03)
+    api.set_speed(100)  # 80 cm/s, reached after 0.53s of acceleration
+    assert clock() == pytest.approx(0.03)
+    clock.sleep(0.27)
+    assert api.get_velocity()['y'] == pytest.approx(150.0 * 0.27, abs=1.0)
+    clock.sleep(1.0)
+    assert api.get_velocity()['y'] == pytest.approx(80.0)
+    distance = 80.0 ** 2 / (2 * 150.0) + 80.0 * (1.3 - 0.03 - 80.0 / 150.0)
+    assert api.get_location()['y'] == pytest.approx(distance, abs=1.0)  # 5ms Euler steps
+
+
+def test_heading_is_clockwise_from_the_aim():
+    clock, api = robot(command_latency=0.0)
+    api.set_heading(90)
+    api.set_speed(50)
+    clock.sleep(2.0)
+    location = api.get_location()
+    assert location['x'] > 50 and abs(location['y']) < 5  # Drifts forward while turning
+
+
+def test_sensor_stream_ticks_on_the_virtual_clock():
+    clock, api = robot()
+    samples = []
+    sensor_control = api._SpheroEduAPI__toy.sensor_control
+    sensor_control.add_sensor_data_listener(samples.append)
+    sensor_control.set_interval(100)
+    clock.sleep(1.0)
+    assert len(samples) == 10
+    assert set(samples[0]) == {'locator', 'velocity', 'gyroscope', 'accelerometer'}
+
+
+def test_wall_bump_stops_the_robot_once_and_raises_a_collision():
+    # Corridor along the locator y axis, walls at x = +-25
+    clock, api = robot(corridor=[(0.0, 0.0), (0.0, 300.0)], corridor_half_width=25.0,
+                       robot_radius=3.65, command_latency=0.0)
+    bumps = []
+    api.register_event("on_collision", lambda api: bumps.append(api.get_location()['x']))
+    api.set_heading(90)
+    api.set_speed(60)
+    clock.sleep(2.0)
+    location = api.get_location()
+    assert location['x'] == pytest.approx(25.0 - 3.65)
+    assert len(bumps) == 1 and bumps[0] == pytest.approx(25.0 - 3.65)
+
+
+def test_locator_drift_turns_the_reported_track():
+    clock, api = robot(locator_drift=2.0, command_latency=0.0)
+    api.set_speed(100)
+    clock.sleep(5.0)
+    location = api.get_location()
+    assert location['x'] > 5  # Reported as veering right, while the robot drives straight on
+    assert api._x == pytest.approx(0.0)
@@ -0,0 +1,111 @@
+"""
+Turn characterization
+Measures how long a heading change really takes, by turn angle and entry
+speed, from the gyroscope; one lookup table per surface
+"""
+
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from json_store import load_entry, save_entry
+
+TURN_ANGLES = (45, 90, 135, 180)
+TURN_SPEEDS = (0, 40, 80)
+TURN_CALIBRATION_PATH = "turn_calibration.json"
+
+SETTLE_RATE = 15.0  # deg/s of yaw rate below which a turn counts as finished
+
+
+def yaw_rate(api) -> float:
+    """Absolute yaw rate (deg/s) from the gyroscope"""
+    return abs(api.get_gyroscope()['z'])
+
+
+def wait_for_settle(api, min_time: float, timeout: float, poll: Callable[[float], None],
+                    clock: Callable[[], float], interval: float = 0.02,
+                    settle_rate: float = SETTLE_RATE) -> float:
+    """Poll the gyro until a commanded turn has started and stopped; returns the seconds taken
+
+    Turns too small to ever exceed `settle_rate` end after `min_time`.
+    """
+    start = clock()
+    turning = False
+    while True:
+        elapsed = clock() - start
+        if elapsed >= timeout:
+            return elapsed
+        rate = yaw_rate(api)
+        if rate > settle_rate:
+            turning = True
+        elif turning or elapsed >= min_time:
+            return elapsed
+        poll(interval)
+
+
+class TurnTable:
+    """Measured turn durations on an (angle, entry speed) grid, bilinear in between"""
+
+    def __init__(self, points: Sequence[Tuple[float, float, float]]):
+        rows: Dict[float, List[Tuple[float, float]]] = {}
+        for angle, speed, duration in points:
+            rows.setdefault(float(speed), []).append((float(abs(angle)), float(duration)))
+        if not rows:
+            raise ValueError("A turn table needs at least one measurement")
+        self.rows = {speed: [(0.0, 0.0)] + sorted(row) for speed, row in sorted(rows.items())}
+
+    @staticmethod
+    def _interpolate(row: List[Tuple[float, float]], x: float) -> float:
+        for (x0, y0), (x1, y1) in zip(row[:-1], row[1:]):
+            if x <= x1 or (x1, y1) == row[-1]:
+                return y0 + (y1 - y0) * (x - x0) / (x1 - x0) if x1 > x0 else y1
+        return row[-1][1]
+
+    def duration(self, angle: float, speed: float) -> float:
+        """Seconds a turn of `angle` degrees takes when entered at `speed` (clamped to the grid)"""
+        angle = abs(angle)
+        speeds = list(self.rows)
+        speed = max(speeds[0], min(speeds[-1], speed))
+        by_speed = [(s, self._interpolate(self.rows[s], angle)) for s in speeds]
+        return max(0.0, self._interpolate(by_speed, speed)) if len(by_speed) > 1 else by_speed[0][1]
+
+    def to_dict(self) -> Dict[str, object]:
+        return {'points': [[angle, speed, duration] for speed, row in self.rows.items()
+                           for angle, duration in row[1:]]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "TurnTable":
+        return cls([tuple(point) for point in data['points']])
+
+
+def load_turn_table(surface: str, path: str = TURN_CALIBRATION_PATH) -> Optional[TurnTable]:
+    """Characterization of `surface` from the JSON file, or None if it was never measured"""
+    entry = load_entry(path, surface)
+    return TurnTable.from_dict(entry) if entry is not None else None
+
+
+def save_turn_table(table: TurnTable, surface: str, path: str = TURN_CALIBRATION_PATH):
+    """Store the characterization of `surface`, keeping the other surfaces in the file"""
+    save_entry(path, surface, dict(table.to_dict(), calibrated=time.strftime("%Y-%m-%d %H:%M:%S")))
+
+
+def characterize_turns(api, angles: Sequence[int] = TURN_ANGLES, speeds: Sequence[int] = TURN_SPEEDS,
+                       run_up: float = 0.8, timeout: float = 3.0,
+                       clock: Callable[[], float] = time.monotonic,
+                       sleep: Callable[[float], None] = time.sleep) -> TurnTable:
+    """Time every angle at every entry speed; turns alternate direction to stay near the start"""
+    points = []
+    heading = 0
+    for speed in speeds:
+        for i, angle in enumerate(angles):
+            api.set_heading(heading)
+            api.set_speed(speed)
+            sleep(run_up if speed else 0.3)  # Reach the entry speed, or let a spin die down
+            heading = (heading + (angle if i % 2 == 0 else -angle)) % 360
+            api.set_heading(heading)
+            duration = wait_for_settle(api, 0.1, timeout, sleep, clock)
+            api.set_speed(0)
+            print(f"   {angle:>3}° at speed {speed:>3} → {duration:.2f}s")
+            points.append((angle, speed, duration))
+            sleep(0.5 if speed else 0.0)
+    api.set_heading(0)
+    return TurnTable(points)